@@ -1,43 +1,41 @@
-from analysis_helper import DatabaseOperations
-import csv
-
-def write_to_csv(data, filename):
-    if not data:
-        print(f"No data to write to {filename}")
-        return
-    
-    fieldnames = data[0].keys()
-    
+from analysis_helper import DatabaseOperations, EXPORT_CHUNK_SIZE, EXPORT_FORMATS, ANALYTICS_BACKENDS, BACKEND_MYSQL
+
+def main(file_format='csv', chunk_size=EXPORT_CHUNK_SIZE, export_results=False, backend=BACKEND_MYSQL):
+    db_ops = DatabaseOperations(backend)
     try:
-        with open(filename, 'w', newline='') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            for row in data:
-                writer.writerow(row)
-        print(f"Data has been successfully written to {filename}")
-    except IOError as e:
-        print(f"Error writing to CSV file {filename}: {e}")
-
-db_ops = DatabaseOperations()
-try:
-    db_ops.connect()
-    db_ops.insert_relay_data()
-    
-    target_combo = db_ops.process_target_combo()
-    target_relayer_combo = db_ops.process_target_relayer_combo()
-
-    if target_combo:
-        write_to_csv(target_combo, 'target_combo.csv')
-        print("Data from target_combo has been saved to 'target_combo.csv'")
-    else:
-        print("No data processed for target_combo table")
-
-    if target_relayer_combo:
-        write_to_csv(target_relayer_combo, 'target_relayer_combo.csv')
-        print("Data from target_relayer_combo has been saved to 'target_relayer_combo.csv'")
-    else:
-        print("No data processed from target_relayer_combo table")
-
-
-finally:
-    db_ops.close()
\ No newline at end of file
+        db_ops.connect()
+        db_ops.insert_relay_data()
+
+        target_combo = db_ops.process_target_combo()
+        target_relayer_combo = db_ops.process_target_relayer_combo()
+
+        if not target_combo:
+            print("No data processed for target_combo table")
+        if not target_relayer_combo:
+            print("No data processed from target_relayer_combo table")
+
+        db_ops.export_table('target_combo', file_format, chunk_size)
+        db_ops.export_table('target_relayer_combo', file_format, chunk_size)
+
+        if export_results:
+            db_ops.export_table('relay_analysis_results', file_format, chunk_size)
+
+    finally:
+        db_ops.close()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Materialize relay analysis results and export the target combo tables")
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv', help='Export file format')
+    parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE, help='Rows fetched from the server per chunk')
+    parser.add_argument('--backend', choices=ANALYTICS_BACKENDS, default=BACKEND_MYSQL, help='Engine for the analytics scans; duckdb reads the Parquet snapshot')
+    parser.add_argument('--export-results', action='store_true', help='Also export the full relay_analysis_results table')
+    args = parser.parse_args()
+
+    main(
+        file_format=args.format,
+        chunk_size=args.chunk_size,
+        export_results=args.export_results,
+        backend=args.backend
+    )
@@ -1,26 +1,52 @@
 import mysql.connector
-import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import database
+
+STAGE_RELAY_ANALYSIS = 'relay_analysis'
+STAGE_DAILY_STATS = 'relay_daily_stats'
+STAGE_RELAYER_DAILY_STATS = 'relayer_daily_stats'
+STAGE_PENDING_DEPOSITS = 'relay_analysis_deposits'
+# The rollups (and the parked-fill recheck) are keyed by ids that span all chains
+DAILY_STATS_CHAIN_ID = 0
+EXPORT_CHUNK_SIZE = 10000
+EXPORT_FORMATS = ('csv', 'parquet')
+BACKEND_MYSQL = 'mysql'
+BACKEND_DUCKDB = 'duckdb'
+ANALYTICS_BACKENDS = (BACKEND_MYSQL, BACKEND_DUCKDB)
+MAX_PENDING_ATTEMPTS = 48
+
+TARGET_COMBO_COLUMNS = ['origin_chain_id', 'destination_chain_id', 'input_symbol', 'output_symbol', 'amount_range']
+TARGET_RELAYER_COMBO_COLUMNS = TARGET_COMBO_COLUMNS + [
+    'relayer', 'transaction_count', 'transaction_percentage', 'total_volume_usd', 'daily_volume_usd',
+    'avg_profit_usd', 'total_profit_usd', 'avg_profit_ratio', 'total_profit_ratio',
+    'avg_net_profit_usd', 'total_net_profit_usd', 'avg_net_profit_ratio', 'total_net_profit_ratio',
+    'avg_relay_time', 'avg_priority_fee'
+]
+# Date bounds substituted into the analytics SQL shared with the DuckDB backend
+MYSQL_DATES = {
+    'combo_window_start': "CURDATE() - INTERVAL 8 DAY",
+    'window_start': "CURDATE() - INTERVAL 7 DAY",
+    'today': "CURDATE()",
+}
 
 class DatabaseOperations:
     general_performance_query = """
             WITH combo_stats AS (
                 WITH daily_stats AS (
                     SELECT 
-                        DATE(fill_block_time) AS date,
+                        fill_date AS date,
                         origin_chain_id, destination_chain_id, input_symbol, output_symbol,
-                        SUM(output_amount_usd) AS daily_volume_usd,
-                        SUM(input_amount_usd - output_amount_usd - gas_fee * 2700) AS daily_profit_usd,
-                        CASE 
-                            WHEN input_amount_usd < 1000 THEN '0-1k'
-                            WHEN input_amount_usd < 10000 THEN '1k-10k'
-                            WHEN input_amount_usd < 100000 THEN '10k-100k'
-                            ELSE '100k+'
-                        END AS amount_range,
-                        COUNT(*) as transaction_count,
-                        AVG(relay_time) AS avg_relay_time_seconds,
-                        MAX(input_amount_usd) AS max_transaction_size_usd
-                    FROM relay_analysis_results
-                    GROUP BY DATE(fill_block_time), origin_chain_id, destination_chain_id, input_symbol, output_symbol, amount_range
+                        SUM(volume_usd) AS daily_volume_usd,
+                        SUM(profit_usd) AS daily_profit_usd,
+                        amount_range,
+                        SUM(transaction_count) as transaction_count,
+                        SUM(relay_time_sum) / SUM(transaction_count) AS avg_relay_time_seconds,
+                        MAX(max_input_amount_usd) AS max_transaction_size_usd
+                    FROM relay_daily_stats
+                    GROUP BY fill_date, origin_chain_id, destination_chain_id, input_symbol, output_symbol, amount_range
                 )
                 SELECT 
                     origin_chain_id, 
@@ -73,44 +99,33 @@ class DatabaseOperations:
         """
     general_daily_data_query = """
         SELECT 
-            DATE(fill_block_time) AS date,
+            fill_date AS date,
             origin_chain_id, destination_chain_id, input_symbol, output_symbol,
-            SUM(output_amount_usd) AS daily_volume_usd,
-            SUM(input_amount_usd - output_amount_usd - gas_fee * 2700) AS daily_total_profit_usd,
-            CASE 
-                WHEN input_amount_usd < 1000 THEN '0-1k'
-                WHEN input_amount_usd < 10000 THEN '1k-10k'
-                WHEN input_amount_usd < 100000 THEN '10k-100k'
-                ELSE '100k+'
-            END AS amount_range,
-            COUNT(*) as transaction_count,
-            AVG(relay_time) AS avg_relay_time_seconds,
-            MAX(input_amount_usd) AS max_transaction_size_usd,
-            SUM(input_amount_usd - output_amount_usd - gas_fee * 2700) / SUM(input_amount_usd) as daily_roi
-        FROM relay_analysis_results
-        GROUP BY DATE(fill_block_time), origin_chain_id, destination_chain_id, input_symbol, output_symbol, amount_range
+            SUM(volume_usd) AS daily_volume_usd,
+            SUM(profit_usd) AS daily_total_profit_usd,
+            amount_range,
+            SUM(transaction_count) as transaction_count,
+            SUM(relay_time_sum) / SUM(transaction_count) AS avg_relay_time_seconds,
+            MAX(max_input_amount_usd) AS max_transaction_size_usd,
+            SUM(profit_usd) / SUM(input_volume_usd) as daily_roi
+        FROM relay_daily_stats
+        GROUP BY fill_date, origin_chain_id, destination_chain_id, input_symbol, output_symbol, amount_range
     """
-    target_combo_query = """
-        INSERT INTO target_combo (origin_chain_id, destination_chain_id, input_symbol, output_symbol, amount_range)
+    target_combo_select = """
         WITH combo_stats AS (
             WITH daily_stats AS (
                 SELECT 
-                    DATE(fill_block_time) AS date,
+                    fill_date AS date,
                     origin_chain_id, destination_chain_id, input_symbol, output_symbol,
-                    SUM(output_amount_usd) AS daily_volume_usd,
-                    SUM(input_amount_usd - output_amount_usd - gas_fee * 2700) AS daily_profit_usd,
-                    CASE 
-                        WHEN input_amount_usd < 1000 THEN '0-1k'
-                        WHEN input_amount_usd < 10000 THEN '1k-10k'
-                        WHEN input_amount_usd < 100000 THEN '10k-100k'
-                        ELSE '100k+'
-                    END AS amount_range,
-                    COUNT(*) as transaction_count,
-                    AVG(relay_time) AS avg_relay_time_seconds,
-                    MAX(input_amount_usd) AS max_transaction_size_usd
-                FROM relay_analysis_results
-                WHERE DATE(fill_block_time) >= DATE_SUB(CURDATE() - 1, INTERVAL 7 DAY)
-                GROUP BY DATE(fill_block_time), origin_chain_id, destination_chain_id, input_symbol, output_symbol, amount_range
+                    SUM(volume_usd) AS daily_volume_usd,
+                    SUM(profit_usd) AS daily_profit_usd,
+                    amount_range,
+                    SUM(transaction_count) as transaction_count,
+                    SUM(relay_time_sum) / SUM(transaction_count) AS avg_relay_time_seconds,
+                    MAX(max_input_amount_usd) AS max_transaction_size_usd
+                FROM relay_daily_stats
+                WHERE fill_date >= {combo_window_start}
+                GROUP BY fill_date, origin_chain_id, destination_chain_id, input_symbol, output_symbol, amount_range
             )
             SELECT 
                 origin_chain_id, 
@@ -142,50 +157,126 @@ class DatabaseOperations:
                 avg_daily_volume_usd / NULLIF(GREATEST(avg_daily_volume_usd, max_transaction_size_usd), 0) AS daily_capital_turnover
             FROM combo_stats
         )
-        SELECT DISTINCT
+        SELECT
             origin_chain_id,
             destination_chain_id,
             input_symbol,
             output_symbol,
             amount_range
         FROM optimal_allocation
-        WHERE annual_roi > 0 
-        AND amount_range != '100k+' 
+        WHERE annual_roi > 0
+        AND amount_range != '100k+'
         AND avg_daily_volume_usd > 100000
-        ORDER BY annual_roi DESC;
+        ORDER BY annual_roi DESC
+    """
+    target_combo_query = f"INSERT INTO {{table}} ({', '.join(TARGET_COMBO_COLUMNS)})" + target_combo_select.format(**MYSQL_DATES)
+    daily_stats_rollup_select = """
+        SELECT
+            fill_date,
+            half_day,
+            origin_chain_id, destination_chain_id, input_symbol, output_symbol,
+            amount_range,
+            CASE 
+                WHEN output_amount_usd < 1000 THEN '0-1000'
+                WHEN output_amount_usd < 10000 THEN '1000-10000'
+                WHEN output_amount_usd < 100000 THEN '10000-100000'
+                WHEN output_amount_usd < 1000000 THEN '100000-1000000'
+                ELSE '1000000+'
+            END AS output_amount_range,
+            SUM(output_amount_usd) AS volume_usd,
+            SUM(input_amount_usd) AS input_volume_usd,
+            SUM(input_amount_usd - output_amount_usd - gas_fee_usd) AS profit_usd,
+            COUNT(*) AS transaction_count,
+            SUM(relay_time) AS relay_time_sum,
+            MAX(input_amount_usd) AS max_input_amount_usd,
+            SUM(CASE WHEN priority_fee_usd / NULLIF(input_amount_usd - output_amount_usd, 0) < 1 THEN priority_fee_usd / NULLIF(input_amount_usd - output_amount_usd, 0) END) AS priority_fee_ratio_sum,
+            COUNT(CASE WHEN priority_fee_usd / NULLIF(input_amount_usd - output_amount_usd, 0) < 1 THEN 1 END) AS priority_fee_ratio_count
+        FROM relay_analysis_results
+        WHERE {condition}
+        GROUP BY fill_date, half_day, origin_chain_id, destination_chain_id, input_symbol, output_symbol, amount_range, output_amount_range
+    """
+    daily_stats_touched_dates_query = """
+        SELECT DISTINCT fill_date FROM relay_analysis_results
+        WHERE id > %s AND id <= %s
+    """
+    daily_stats_rollup_query = """
+        INSERT INTO relay_daily_stats (
+            fill_date, half_day, origin_chain_id, destination_chain_id, input_symbol, output_symbol,
+            amount_range, output_amount_range, volume_usd, input_volume_usd, profit_usd, transaction_count,
+            relay_time_sum, max_input_amount_usd, priority_fee_ratio_sum, priority_fee_ratio_count
+        )""" + daily_stats_rollup_select
+    relayer_daily_stats_rollup_select = """
+        SELECT
+            fill_date, origin_chain_id, destination_chain_id, input_symbol, output_symbol, amount_range, relayer,
+            COUNT(*) AS transaction_count,
+            SUM(output_amount_usd) AS volume_usd
+        FROM relay_analysis_results
+        WHERE {condition}
+        GROUP BY fill_date, origin_chain_id, destination_chain_id, input_symbol, output_symbol, amount_range, relayer
+    """
+    relayer_daily_stats_touched_dates_query = """
+        SELECT DISTINCT fill_date FROM relay_analysis_results
+        WHERE id > %s AND id <= %s AND fill_date >= %s
     """
-    target_relayer_combo_query = """
-        CREATE TABLE target_relayer_combo AS                    
-            WITH combo_totals AS (
+    relayer_daily_stats_rollup_query = """
+        INSERT INTO relayer_daily_stats (
+            fill_date, origin_chain_id, destination_chain_id, input_symbol, output_symbol, amount_range, relayer,
+            transaction_count, volume_usd
+        )""" + relayer_daily_stats_rollup_select
+    # Only fills with a fee quote count towards the relayer breakdown, as in the inner join on fee_data
+    relayer_daily_fee_stats_rollup_select = """
+        SELECT
+            rar.fill_date, rar.origin_chain_id, rar.destination_chain_id, rar.input_symbol, rar.output_symbol, rar.amount_range, rar.relayer,
+            COUNT(*) AS fee_transaction_count,
+            SUM(rar.output_amount_usd) AS fee_volume_usd,
+            SUM(rar.input_amount_usd - rar.output_amount_usd - rar.gas_fee_usd) AS fee_profit_usd,
+            SUM(rar.input_amount_usd - rar.output_amount_usd - rar.gas_fee_usd - rar.output_amount_usd * fd.lp_fee_pct / 1e18) AS fee_net_profit_usd,
+            SUM(rar.relay_time) AS fee_relay_time_sum,
+            SUM(rar.priority_fee_usd) AS fee_priority_fee_usd_sum
+        FROM relay_analysis_results rar
+        JOIN fee_data fd ON
+            rar.deposit_id = fd.deposit_id AND
+            rar.origin_chain_id = fd.origin_chain_id AND
+            rar.destination_chain_id = fd.destination_chain_id
+        WHERE {condition}
+        GROUP BY rar.fill_date, rar.origin_chain_id, rar.destination_chain_id, rar.input_symbol, rar.output_symbol, rar.amount_range, rar.relayer
+    """
+    relayer_daily_fee_stats_rollup_query = """
+        INSERT INTO relayer_daily_stats (
+            fill_date, origin_chain_id, destination_chain_id, input_symbol, output_symbol, amount_range, relayer,
+            fee_transaction_count, fee_volume_usd, fee_profit_usd, fee_net_profit_usd, fee_relay_time_sum, fee_priority_fee_usd_sum
+        )""" + relayer_daily_fee_stats_rollup_select + """
+        ON DUPLICATE KEY UPDATE
+            fee_transaction_count = VALUES(fee_transaction_count),
+            fee_volume_usd = VALUES(fee_volume_usd),
+            fee_profit_usd = VALUES(fee_profit_usd),
+            fee_net_profit_usd = VALUES(fee_net_profit_usd),
+            fee_relay_time_sum = VALUES(fee_relay_time_sum),
+            fee_priority_fee_usd_sum = VALUES(fee_priority_fee_usd_sum)
+    """
+    target_relayer_combo_select = """
+            WITH window_stats AS (
+                SELECT *
+                FROM relayer_daily_stats
+                WHERE fill_date >= {window_start} AND fill_date < {today}
+            ),
+            combo_totals AS (
                 SELECT 
-                    tc.origin_chain_id,
-                    tc.destination_chain_id,
-                    tc.input_symbol,
-                    tc.output_symbol,
-                    tc.amount_range,
-                    SUM(rar.output_amount_usd) AS total_volume_usd,
-                    COUNT(*) AS total_transactions
+                    origin_chain_id,
+                    destination_chain_id,
+                    input_symbol,
+                    output_symbol,
+                    amount_range,
+                    SUM(volume_usd) AS total_volume_usd,
+                    SUM(transaction_count) AS total_transactions
                 FROM 
-                    target_combo tc
-                JOIN 
-                    relay_analysis_results rar ON 
-                        tc.origin_chain_id = rar.origin_chain_id AND
-                        tc.destination_chain_id = rar.destination_chain_id AND
-                        tc.input_symbol = rar.input_symbol AND
-                        tc.output_symbol = rar.output_symbol AND
-                        tc.amount_range = CASE 
-                            WHEN rar.input_amount_usd < 1000 THEN '0-1k'
-                            WHEN rar.input_amount_usd < 10000 THEN '1k-10k'
-                            WHEN rar.input_amount_usd < 100000 THEN '10k-100k'
-                            ELSE '100k+'
-                        END
-                WHERE rar.fill_block_time >= DATE_SUB(NOW(), INTERVAL 7 DAY)
+                    window_stats
                 GROUP BY 
-                    tc.origin_chain_id,
-                    tc.destination_chain_id,
-                    tc.input_symbol,
-                    tc.output_symbol,
-                    tc.amount_range
+                    origin_chain_id,
+                    destination_chain_id,
+                    input_symbol,
+                    output_symbol,
+                    amount_range
             )
             SELECT 
                 tc.origin_chain_id,
@@ -193,35 +284,30 @@ class DatabaseOperations:
                 tc.input_symbol,
                 tc.output_symbol,
                 tc.amount_range,
-                rar.relayer,
-                COUNT(*) AS transaction_count,
-                (COUNT(*) * 100.0 / ct.total_transactions) AS transaction_percentage,
+                s.relayer,
+                SUM(s.fee_transaction_count) AS transaction_count,
+                (SUM(s.fee_transaction_count) * 100.0 / NULLIF(ct.total_transactions, 0)) AS transaction_percentage,
                 ct.total_volume_usd,
                 ct.total_volume_usd / 7 AS daily_volume_usd,
-                AVG(rar.input_amount_usd - rar.output_amount_usd - rar.gas_fee * 2700) as avg_profit_usd,
-                SUM(rar.input_amount_usd - rar.output_amount_usd - rar.gas_fee * 2700) as total_profit_usd,
-                AVG(rar.input_amount_usd - rar.output_amount_usd - rar.gas_fee * 2700) / AVG(rar.output_amount_usd) AS avg_profit_ratio,
-                SUM(rar.input_amount_usd - rar.output_amount_usd - rar.gas_fee * 2700) / SUM(rar.output_amount_usd) AS total_profit_ratio,
-                AVG(rar.input_amount_usd - rar.output_amount_usd - rar.gas_fee * 2700 - rar.output_amount_usd * fd.lp_fee_pct / 1e18) as avg_net_profit_usd,
-                SUM(rar.input_amount_usd - rar.output_amount_usd - rar.gas_fee * 2700 - rar.output_amount_usd * fd.lp_fee_pct / 1e18) as total_net_profit_usd,
-                AVG(rar.input_amount_usd - rar.output_amount_usd - rar.gas_fee * 2700 - rar.output_amount_usd * fd.lp_fee_pct / 1e18) / AVG(rar.output_amount_usd) AS avg_net_profit_ratio,
-                SUM(rar.input_amount_usd - rar.output_amount_usd - rar.gas_fee * 2700 - rar.output_amount_usd * fd.lp_fee_pct / 1e18) / SUM(rar.output_amount_usd) AS total_net_profit_ratio,
-                AVG(rar.relay_time) as avg_relay_time,
-                AVG(rar.priority_fee * 2700) as avg_priority_fee
+                SUM(s.fee_profit_usd) / NULLIF(SUM(s.fee_transaction_count), 0) as avg_profit_usd,
+                SUM(s.fee_profit_usd) as total_profit_usd,
+                SUM(s.fee_profit_usd) / NULLIF(SUM(s.fee_volume_usd), 0) AS avg_profit_ratio,
+                SUM(s.fee_profit_usd) / NULLIF(SUM(s.fee_volume_usd), 0) AS total_profit_ratio,
+                SUM(s.fee_net_profit_usd) / NULLIF(SUM(s.fee_transaction_count), 0) as avg_net_profit_usd,
+                SUM(s.fee_net_profit_usd) as total_net_profit_usd,
+                SUM(s.fee_net_profit_usd) / NULLIF(SUM(s.fee_volume_usd), 0) AS avg_net_profit_ratio,
+                SUM(s.fee_net_profit_usd) / NULLIF(SUM(s.fee_volume_usd), 0) AS total_net_profit_ratio,
+                SUM(s.fee_relay_time_sum) / NULLIF(SUM(s.fee_transaction_count), 0) as avg_relay_time,
+                SUM(s.fee_priority_fee_usd_sum) / NULLIF(SUM(s.fee_transaction_count), 0) as avg_priority_fee
             FROM 
                 target_combo tc
             JOIN 
-                relay_analysis_results rar ON 
-                    tc.origin_chain_id = rar.origin_chain_id AND
-                    tc.destination_chain_id = rar.destination_chain_id AND
-                    tc.input_symbol = rar.input_symbol AND
-                    tc.output_symbol = rar.output_symbol AND
-                    tc.amount_range = CASE 
-                        WHEN rar.input_amount_usd < 1000 THEN '0-1k'
-                        WHEN rar.input_amount_usd < 10000 THEN '1k-10k'
-                        WHEN rar.input_amount_usd < 100000 THEN '10k-100k'
-                        ELSE '100k+'
-                    END
+                window_stats s ON 
+                    tc.origin_chain_id = s.origin_chain_id AND
+                    tc.destination_chain_id = s.destination_chain_id AND
+                    tc.input_symbol = s.input_symbol AND
+                    tc.output_symbol = s.output_symbol AND
+                    tc.amount_range = s.amount_range
             JOIN
                 combo_totals ct ON
                     tc.origin_chain_id = ct.origin_chain_id AND
@@ -229,63 +315,199 @@ class DatabaseOperations:
                     tc.input_symbol = ct.input_symbol AND
                     tc.output_symbol = ct.output_symbol AND
                     tc.amount_range = ct.amount_range
-            JOIN
-                fee_data fd ON
-                    rar.deposit_id = fd.deposit_id AND
-                    rar.origin_chain_id = fd.origin_chain_id AND
-                    rar.destination_chain_id = fd.destination_chain_id
-            WHERE rar.fill_block_time >= DATE_SUB(NOW(), INTERVAL 7 DAY)
             GROUP BY 
                 tc.origin_chain_id,
                 tc.destination_chain_id,
                 tc.input_symbol,
                 tc.output_symbol,
                 tc.amount_range,
-                rar.relayer,
-                ct.total_transactions
+                s.relayer,
+                ct.total_transactions,
+                ct.total_volume_usd
             HAVING 
-                SUM(rar.input_amount_usd - rar.output_amount_usd - rar.gas_fee * 2700) > 30
+                SUM(s.fee_transaction_count) > 0 AND
+                SUM(s.fee_profit_usd) > 30
             ORDER BY 
                 tc.origin_chain_id,
                 tc.destination_chain_id,
                 tc.input_symbol,
                 tc.output_symbol,
                 tc.amount_range,
-                total_net_profit_usd DESC;
+                total_net_profit_usd DESC
+    """
+    target_relayer_combo_query = "CREATE TABLE {table} AS" + target_relayer_combo_select.format(**MYSQL_DATES)
+    # Fills fee_fetcher quotes: the last 7 days of target_combo pairs in the quoted amount ranges
+    fee_token_pairs_query = """
+        SELECT r.origin_chain_id, r.destination_chain_id, r.input_token, r.output_token, r.deposit_block_time, f.output_amount, r.deposit_id
+            FROM relay_analysis_results r 
+            JOIN filled_v3_relays f ON f.origin_chain_id = r.origin_chain_id 
+                AND f.chain_id = r.destination_chain_id 
+                AND f.input_token = r.input_token 
+                AND f.output_token = r.output_token 
+                AND f.deposit_id = r.deposit_id
+            JOIN target_combo tc ON r.origin_chain_id = tc.origin_chain_id
+                AND r.destination_chain_id = tc.destination_chain_id
+                AND r.input_symbol = tc.input_symbol
+                AND r.output_symbol = tc.output_symbol
+            WHERE r.fill_date >= DATE_SUB(CURDATE(), INTERVAL 7 DAY)
+            AND (
+                (tc.amount_range = '1k-10k' AND r.output_amount_usd > 1000 AND r.output_amount_usd < 10000)
+                OR
+                (tc.amount_range = '10k-100k' AND r.output_amount_usd > 10000 AND r.output_amount_usd < 100000)
+            )
+    """
+
+    insert_query = """
+    INSERT INTO relay_analysis_results (
+        deposit_id, destination_chain_id, origin_chain_id, input_token, output_token,
+        relayer, depositor, recipient, input_amount, output_amount, input_amount_usd,
+        output_amount_usd, input_symbol, output_symbol, gas_fee, priority_fee, gas_fee_usd, priority_fee_usd,
+        base_fee_per_gas, gas_used, priority_fee_per_gas, relay_time, deposit_block_time, fill_block_time, transaction_hash, exclusive_relayer
+    )
+    SELECT 
+        f.deposit_id,
+        f.chain_id AS destination_chain_id,
+        d.chain_id AS origin_chain_id,
+        f.input_token,
+        f.output_token,
+        f.relayer,
+        f.depositor,
+        d.recipient,
+        f.input_amount / POW(10, ti.decimals) AS input_amount,
+        f.output_amount / POW(10, tout.decimals) AS output_amount,
+        f.input_amount / POW(10, ti.decimals) * COALESCE(pi.price_usd, 1) AS input_amount_usd,
+        f.output_amount / POW(10, tout.decimals) * COALESCE(po.price_usd, 1) AS output_amount_usd,
+        ti.symbol AS input_symbol,
+        tout.symbol AS output_symbol,
+        COALESCE(t.total_gas_fee, 0) / 1e18 AS gas_fee,
+        GREATEST(0, t.gas_price - b.base_fee_per_gas) * t.gas_used / 1e18 AS priority_fee,
+        COALESCE(t.total_gas_fee, 0) / 1e18 * pn.price_usd AS gas_fee_usd,
+        GREATEST(0, t.gas_price - b.base_fee_per_gas) * t.gas_used / 1e18 * pn.price_usd AS priority_fee_usd,
+        b.base_fee_per_gas / 1e9 AS base_fee_per_gas,
+        t.gas_used,
+        GREATEST(0, t.gas_price - b.base_fee_per_gas) / 1e9 AS priority_fee_per_gas,
+        TIMESTAMPDIFF(SECOND, bd.block_timestamp, bf.block_timestamp) AS relay_time,
+        bd.block_timestamp AS deposit_block_time, 
+        bf.block_timestamp AS fill_block_time,
+        f.transaction_hash,
+        f.exclusive_relayer            
+    FROM 
+        {fills}
+    JOIN
+        v3_funds_deposited d ON f.deposit_id = d.deposit_id AND f.origin_chain_id = d.chain_id
+    JOIN
+        transaction_details t ON f.transaction_hash = t.transaction_hash AND f.chain_id = t.chain_id
+    JOIN
+        block_details b ON t.chain_id = b.chain_id AND b.block_number = f.block_number
+    JOIN
+        block_details bf ON f.chain_id = bf.chain_id AND bf.block_number = f.block_number
+    JOIN
+        block_details bd ON d.chain_id = bd.chain_id AND bd.block_number = d.block_number
+    JOIN
+        token_registry ti ON ti.chain_id = f.origin_chain_id AND ti.token_address = f.input_token
+    JOIN
+        token_registry tout ON tout.chain_id = f.chain_id AND tout.token_address = f.output_token
+    JOIN
+        token_price_history pi ON pi.symbol = ti.symbol AND pi.bucket_start = {input_price_bucket}
+    JOIN
+        token_price_history po ON po.symbol = tout.symbol AND po.bucket_start = {output_price_bucket}
+    JOIN
+        chain_native_token n ON n.chain_id = f.chain_id
+    JOIN
+        token_price_history pn ON pn.symbol = n.symbol AND pn.bucket_start = {native_price_bucket}
+    LEFT JOIN
+        relay_analysis_results r ON f.deposit_id = r.deposit_id AND f.chain_id = r.destination_chain_id
+    WHERE {condition} AND r.id IS NULL
+    AND ti.enabled AND tout.enabled
     """
     
-    def __init__(self):
-        self.db_config = self.get_db_config()
+    # Price in effect at fill time: the latest bucket at or before the fill block,
+    # falling back to the earliest bucket for fills older than the price history
+    price_bucket_query = """(
+        SELECT COALESCE(
+            (SELECT MAX(h.bucket_start) FROM token_price_history h WHERE h.symbol = {token}.symbol AND h.bucket_start <= bf.block_timestamp),
+            (SELECT MIN(h.bucket_start) FROM token_price_history h WHERE h.symbol = {token}.symbol)
+        )
+    )"""
+
+    new_fills_query = insert_query.format(
+        fills="filled_v3_relays f",
+        condition="f.chain_id = %s AND f.id > %s AND f.id <= %s",
+        input_price_bucket=price_bucket_query.format(token='ti'),
+        output_price_bucket=price_bucket_query.format(token='tout'),
+        native_price_bucket=price_bucket_query.format(token='n')
+    )
+    pending_fills_query = insert_query.format(
+        fills="relay_analysis_pending p JOIN filled_v3_relays f ON f.id = p.fill_id",
+        condition="p.fill_id > %s AND p.fill_id <= %s AND p.attempts < %s",
+        input_price_bucket=price_bucket_query.format(token='ti'),
+        output_price_bucket=price_bucket_query.format(token='tout'),
+        native_price_bucket=price_bucket_query.format(token='n')
+    )
+
+    # Shape of target_relayer_combo when its rows are computed outside MySQL
+    target_relayer_combo_table = """
+        CREATE TABLE {table} (
+            origin_chain_id INT NOT NULL,
+            destination_chain_id INT NOT NULL,
+            input_symbol VARCHAR(10) NOT NULL,
+            output_symbol VARCHAR(10) NOT NULL,
+            amount_range VARCHAR(20) NOT NULL,
+            relayer VARCHAR(42) NOT NULL,
+            transaction_count BIGINT,
+            transaction_percentage DECIMAL(65, 4),
+            total_volume_usd DECIMAL(65, 18),
+            daily_volume_usd DECIMAL(65, 18),
+            avg_profit_usd DECIMAL(65, 18),
+            total_profit_usd DECIMAL(65, 18),
+            avg_profit_ratio DECIMAL(65, 18),
+            total_profit_ratio DECIMAL(65, 18),
+            avg_net_profit_usd DECIMAL(65, 18),
+            total_net_profit_usd DECIMAL(65, 18),
+            avg_net_profit_ratio DECIMAL(65, 18),
+            total_net_profit_ratio DECIMAL(65, 18),
+            avg_relay_time DECIMAL(65, 4),
+            avg_priority_fee DECIMAL(65, 18)
+        )
+    """
+
+    def __init__(self, backend=BACKEND_MYSQL):
         self.conn = None
         self.cursor = None
+        self.backend = backend
+        self.analytics = None
 
-    def get_db_config(self):
-        try:
-            with open('database_config.json', 'r') as config_file:
-                config = json.load(config_file)
-                return config['database']
-        except FileNotFoundError:
-            print("Error: config.json file not found.")
-            return None
-        except json.JSONDecodeError:
-            print("Error: config.json is not a valid JSON file.")
-            return None
-        except KeyError:
-            print("Error: 'database' key not found in config.json.")
-            return None
-    
     def connect(self):
-        self.conn = mysql.connector.connect(**self.db_config)
+        self.conn = database.get_connection()
+        self.cursor = self.conn.cursor()
+        if self.backend == BACKEND_DUCKDB:
+            # Scans run in-process over the Parquet snapshot; MySQL still owns ingestion and the target tables
+            from duckdb_backend import DuckDBAnalytics
+            self.analytics = DuckDBAnalytics()
+            if not self.analytics.connect():
+                print("No relay analysis results to snapshot yet, running analytics on MySQL for this run")
+                self.analytics.close()
+                self.analytics = None
+
+    def ensure_connected(self):
+        if self.conn.is_connected():
+            return
+        print("MySQL connection lost. Reconnecting...")
+        if not database.ensure_connected(self.conn):
+            raise mysql.connector.Error("Could not reconnect to MySQL")
         self.cursor = self.conn.cursor()
 
     def close(self):
+        if self.analytics:
+            self.analytics.close()
         if self.cursor:
             self.cursor.close()
-        if self.conn and self.conn.is_connected():
+        if self.conn:
             self.conn.close()
-            print("MySQL connection is closed")
+            print("MySQL connection returned to pool")
 
     def execute_query(self, query): 
+        self.ensure_connected()
         try:
             print("Executing query...")
             self.cursor.execute(query)
@@ -301,185 +523,264 @@ class DatabaseOperations:
             else:
                 print(f"An error occurred: {err}")
         
+    def get_watermark(self, chain_id, stage):
+        query = """
+        SELECT watermark
+        FROM sync_watermarks
+        WHERE chain_id = %s AND stage = %s
+        """
+        self.cursor.execute(query, (chain_id, stage))
+        result = self.cursor.fetchone()
+        return result[0] if result else None
+
+    def advance_watermark(self, chain_id, stage, watermark, commit=True):
+        # Runs on self.cursor so it commits together with the batch it covers
+        query = """
+        INSERT INTO sync_watermarks (chain_id, stage, watermark)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            watermark = GREATEST(watermark, VALUES(watermark)),
+            updated_at = CURRENT_TIMESTAMP
+        """
+        self.cursor.execute(query, (chain_id, stage, watermark))
+        if commit:
+            self.conn.commit()
+
     def insert_relay_data(self, batch_size=1000):
-        get_existing_combinations_query = """
-        SELECT DISTINCT deposit_id, destination_chain_id FROM relay_analysis_results
+        get_chains_query = """
+        SELECT DISTINCT chain_id FROM filled_v3_relays
         """
-        
-        get_new_combinations_query = """
-        SELECT DISTINCT f.deposit_id, f.chain_id AS destination_chain_id
+
+        get_new_fill_ids_query = """
+        SELECT id FROM filled_v3_relays
+        WHERE chain_id = %s AND id > %s
+        ORDER BY id
+        """
+
+        get_pending_fill_ids_query = """
+        SELECT fill_id FROM relay_analysis_pending
+        WHERE attempts < %s
+        ORDER BY fill_id
+        """
+
+        # Fills in the batch that could not be joined yet (missing block, tx or price data)
+        record_pending_query = """
+        INSERT IGNORE INTO relay_analysis_pending (fill_id, deposit_id, destination_chain_id)
+        SELECT f.id, f.deposit_id, f.chain_id
         FROM filled_v3_relays f
         LEFT JOIN relay_analysis_results r ON f.deposit_id = r.deposit_id AND f.chain_id = r.destination_chain_id
-        WHERE r.deposit_id IS NULL
-        ORDER BY f.deposit_id, f.chain_id
+        WHERE f.chain_id = %s AND f.id > %s AND f.id <= %s AND r.id IS NULL
         """
-        
-        insert_query = """
-        INSERT INTO relay_analysis_results (
-            deposit_id, destination_chain_id, origin_chain_id, input_token, output_token,
-            relayer, depositor, recipient, input_amount, output_amount, input_amount_usd,
-            output_amount_usd, input_symbol, output_symbol, gas_fee, priority_fee,
-            base_fee_per_gas, gas_used, priority_fee_per_gas, relay_time, deposit_block_time, fill_block_time, transaction_hash, exclusive_relayer
-        )
-        SELECT 
-            f.deposit_id,
-            f.chain_id AS destination_chain_id,
-            d.chain_id AS origin_chain_id,
-            f.input_token,
-            f.output_token,
-            f.relayer,
-            f.depositor,
-            d.recipient,
-            CASE 
-                WHEN pi.symbol IN ('WETH', 'ETH') THEN f.input_amount / 1e18
-                WHEN pi.symbol = 'WBTC' THEN f.input_amount / 1e8
-                WHEN pi.symbol IN ('USDT', 'USDC') THEN f.input_amount / 1e6
-                WHEN pi.symbol = 'DAI' THEN f.input_amount / 1e18
-                ELSE f.input_amount
-            END AS input_amount,
-            CASE 
-                WHEN po.symbol IN ('WETH', 'ETH') THEN f.output_amount / 1e18
-                WHEN po.symbol = 'WBTC' THEN f.output_amount / 1e8
-                WHEN po.symbol IN ('USDT', 'USDC') THEN f.output_amount / 1e6
-                WHEN po.symbol = 'DAI' THEN f.output_amount / 1e18
-                ELSE f.output_amount
-            END AS output_amount,
-            CASE 
-                WHEN pi.symbol IN ('WETH', 'ETH') THEN (f.input_amount / 1e18) * COALESCE(pi.price_usd, 1)
-                WHEN pi.symbol = 'WBTC' THEN (f.input_amount / 1e8) * COALESCE(pi.price_usd, 1)
-                WHEN pi.symbol IN ('USDT', 'USDC') THEN (f.input_amount / 1e6) * COALESCE(pi.price_usd, 1)
-                WHEN pi.symbol = 'DAI' THEN (f.input_amount / 1e18) * COALESCE(pi.price_usd, 1)
-                ELSE f.input_amount * COALESCE(pi.price_usd, 1)
-            END AS input_amount_usd,
-            CASE 
-                WHEN po.symbol IN ('WETH', 'ETH') THEN (f.output_amount / 1e18) * COALESCE(po.price_usd, 1)
-                WHEN po.symbol = 'WBTC' THEN (f.output_amount / 1e8) * COALESCE(po.price_usd, 1)
-                WHEN po.symbol IN ('USDT', 'USDC') THEN (f.output_amount / 1e6) * COALESCE(po.price_usd, 1)
-                WHEN po.symbol = 'DAI' THEN (f.output_amount / 1e18) * COALESCE(po.price_usd, 1)
-                ELSE f.output_amount * COALESCE(po.price_usd, 1)
-            END AS output_amount_usd,
-            pi.symbol as input_symbol,
-            po.symbol as output_symbol,
-            COALESCE(t.total_gas_fee, 0) / 1e18 AS gas_fee,
-            GREATEST(0, t.gas_price - b.base_fee_per_gas) * t.gas_used / 1e18 AS priority_fee,
-            b.base_fee_per_gas / 1e9 AS base_fee_per_gas,
-            t.gas_used,
-            GREATEST(0, t.gas_price - b.base_fee_per_gas) / 1e9 AS priority_fee_per_gas,
-            TIMESTAMPDIFF(SECOND, bd.block_timestamp, bf.block_timestamp) AS relay_time,
-            bd.block_timestamp AS deposit_block_time, 
-            bf.block_timestamp AS fill_block_time,
-            f.transaction_hash,
-            f.exclusive_relayer            
-        FROM 
-            filled_v3_relays f
-        JOIN
-            v3_funds_deposited d ON f.deposit_id = d.deposit_id AND f.origin_chain_id = d.chain_id
-        JOIN
-            transaction_details t ON f.transaction_hash = t.transaction_hash AND f.chain_id = t.chain_id
-        JOIN
-            block_details b ON t.chain_id = b.chain_id AND b.block_number = f.block_number
-        JOIN
-            block_details bf ON f.chain_id = bf.chain_id AND bf.block_number = f.block_number
-        JOIN
-            block_details bd ON d.chain_id = bd.chain_id AND bd.block_number = d.block_number
-        JOIN
-            (SELECT token_address, price_usd, symbol FROM token_prices) pi ON f.input_token = pi.token_address
-        JOIN
-            (SELECT token_address, price_usd, symbol FROM token_prices) po ON f.output_token = po.token_address
-        WHERE (f.deposit_id, f.chain_id) IN ({})
-        AND (pi.token_address IN (
-            '0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2',
-            '0x2260fac5e5542a773aa44fbcfedf7c193bc2c599',
-            '0x6b175474e89094c44da98b954eedeac495271d0f',
-            '0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48',
-            '0xdac17f958d2ee523a2206206994597c13d831ec7',
-            '0x4200000000000000000000000000000000000006',
-            '0x68f180fcce6836688e9084f035309e29bf0a2095',
-            '0xda10009cbd5d07dd0cecc66161fc93d7c9000da1',
-            '0x0b2c639c533813f4aa9d7837caf62653d097ff85',
-            '0x94b008aa00579c1307b0ef2c499ad98a8ce58e58',
-            '0x4200000000000000000000000000000000000006',
-            '0x50c5725949a6f0c72e6c4a641f24049a917db0cb',
-            '0x833589fcd6edb6e08f4c7c32d4f71b54bda02913',
-            '0xfde4C96c8593536E31F229EA8f37b2ADa2699bb2',
-            '0x7ceb23fd6bc0add59e62ac25578270cff1b9f619',
-            '0x1BFD67037B42Cf73acF2047067bd4F2C47D9BfD6',
-            '0x8f3Cf7ad23Cd3CaDbD9735AFf958023239c6A063',
-            '0x2791Bca1f2de4661ED88A30C99A7a9449Aa84174',
-            '0xc2132d05d31c914a87c6611c10748aeb04b58e8f',
-            '0x82af49447d8a07e3bd95bd0d56f35241523fbab1',
-            '0x2f2a2543b76a4166549f7aab2e75bef0aefc5b0f',
-            '0xda10009cbd5d07dd0cecc66161fc93d7c9000da1',
-            '0xaf88d065e77c8cc2239327c5edb3a432268e5831',
-            '0xfd086bc7cd5c481dcc9c85ebe478a1c0b69fcbb9'
-        ) AND po.token_address IN (
-            '0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2',
-            '0x2260fac5e5542a773aa44fbcfedf7c193bc2c599',
-            '0x6b175474e89094c44da98b954eedeac495271d0f',
-            '0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48',
-            '0xdac17f958d2ee523a2206206994597c13d831ec7',
-            '0x4200000000000000000000000000000000000006',
-            '0x68f180fcce6836688e9084f035309e29bf0a2095',
-            '0xda10009cbd5d07dd0cecc66161fc93d7c9000da1',
-            '0x0b2c639c533813f4aa9d7837caf62653d097ff85',
-            '0x94b008aa00579c1307b0ef2c499ad98a8ce58e58',
-            '0x4200000000000000000000000000000000000006',
-            '0x50c5725949a6f0c72e6c4a641f24049a917db0cb',
-            '0x833589fcd6edb6e08f4c7c32d4f71b54bda02913',
-            '0xfde4C96c8593536E31F229EA8f37b2ADa2699bb2',
-            '0x7ceb23fd6bc0add59e62ac25578270cff1b9f619',
-            '0x1BFD67037B42Cf73acF2047067bd4F2C47D9BfD6',
-            '0x8f3Cf7ad23Cd3CaDbD9735AFf958023239c6A063',
-            '0x2791Bca1f2de4661ED88A30C99A7a9449Aa84174',
-            '0xc2132d05d31c914a87c6611c10748aeb04b58e8f',
-            '0x82af49447d8a07e3bd95bd0d56f35241523fbab1',
-            '0x2f2a2543b76a4166549f7aab2e75bef0aefc5b0f',
-            '0xda10009cbd5d07dd0cecc66161fc93d7c9000da1',
-            '0xaf88d065e77c8cc2239327c5edb3a432268e5831',
-            '0xfd086bc7cd5c481dcc9c85ebe478a1c0b69fcbb9'
-        ))
+
+        resolve_pending_query = """
+        DELETE p FROM relay_analysis_pending p
+        JOIN relay_analysis_results r ON p.deposit_id = r.deposit_id AND p.destination_chain_id = r.destination_chain_id
+        WHERE p.fill_id > %s AND p.fill_id <= %s
         """
-        
+
+        retry_pending_query = """
+        UPDATE relay_analysis_pending
+        SET attempts = attempts + 1, last_attempt_at = CURRENT_TIMESTAMP
+        WHERE fill_id > %s AND fill_id <= %s AND attempts < %s
+        """
+
+        # Parked fills whose deposit was indexed since the last run get a fresh set of attempts
+        requeue_parked_query = """
+        UPDATE relay_analysis_pending p
+        JOIN filled_v3_relays f ON f.id = p.fill_id
+        JOIN v3_funds_deposited d ON f.deposit_id = d.deposit_id AND f.origin_chain_id = d.chain_id
+        SET p.attempts = 0
+        WHERE p.attempts >= %s AND d.id > %s AND d.id <= %s
+        """
+
+        count_parked_query = """
+        SELECT COUNT(*) FROM relay_analysis_pending
+        WHERE attempts >= %s
+        """
+
+        self.ensure_connected()
+        total_inserted = 0
+
         try:
-            # Get existing combinations
-            print("Fetching existing deposit_id and destination_chain_id combinations...")
-            self.cursor.execute(get_existing_combinations_query)
-            existing_combinations = set((row[0], row[1]) for row in self.cursor.fetchall())
-            
-            # Get new combinations
-            print("Fetching new deposit_id and destination_chain_id combinations...")
-            self.cursor.execute(get_new_combinations_query)
-            new_combinations = [row for row in self.cursor.fetchall()]
-            
-            total_inserted = 0
-            
-            # Process in batches
-            for i in range(0, len(new_combinations), batch_size):
-                batch_combinations = new_combinations[i:i+batch_size]
-                
-                formatted_query = insert_query.format(','.join(['(%s,%s)'] * len(batch_combinations)))
-                flattened_combinations = [item for sublist in batch_combinations for item in sublist]
-                
+            deposit_watermark = self.get_watermark(DAILY_STATS_CHAIN_ID, STAGE_PENDING_DEPOSITS) or 0
+            self.cursor.execute("SELECT MAX(id) FROM v3_funds_deposited")
+            deposit_high = self.cursor.fetchone()[0] or deposit_watermark
+            if deposit_high > deposit_watermark:
+                self.cursor.execute(requeue_parked_query, (MAX_PENDING_ATTEMPTS, deposit_watermark, deposit_high))
+                requeued = self.cursor.rowcount
+                self.advance_watermark(DAILY_STATS_CHAIN_ID, STAGE_PENDING_DEPOSITS, deposit_high)
+                if requeued:
+                    print(f"Requeued {requeued} parked fills whose deposit has arrived")
+
+            self.cursor.execute(count_parked_query, (MAX_PENDING_ATTEMPTS,))
+            parked = self.cursor.fetchone()[0]
+            if parked:
+                print(f"{parked} fills parked after {MAX_PENDING_ATTEMPTS} attempts, waiting for their deposit (see relay_analysis_pending)")
+
+            # Retry fills that were waiting on block/tx/price data in earlier runs
+            self.cursor.execute(get_pending_fill_ids_query, (MAX_PENDING_ATTEMPTS,))
+            pending_fill_ids = [row[0] for row in self.cursor.fetchall()]
+            print(f"Retrying {len(pending_fill_ids)} pending fills")
+
+            for i in range(0, len(pending_fill_ids), batch_size):
+                batch = pending_fill_ids[i:i+batch_size]
+                low, high = batch[0] - 1, batch[-1]
                 try:
-                    print(f"Processing batch {i//batch_size + 1}, combinations {batch_combinations[0]} to {batch_combinations[-1]}")
-                    self.cursor.execute(formatted_query, flattened_combinations)
-                    self.conn.commit()
+                    self.cursor.execute(self.pending_fills_query, (low, high, MAX_PENDING_ATTEMPTS))
                     inserted = self.cursor.rowcount
+                    self.cursor.execute(resolve_pending_query, (low, high))
+                    self.cursor.execute(retry_pending_query, (low, high, MAX_PENDING_ATTEMPTS))
+                    self.conn.commit()
                     total_inserted += inserted
-                    print(f"Inserted {inserted} rows in this batch. Total inserted: {total_inserted}")
+                    print(f"Inserted {inserted} pending fills in this batch. Total inserted: {total_inserted}")
                 except mysql.connector.Error as err:
-                    print(f"Error processing batch: {err}")
+                    print(f"Error retrying pending fills {batch[0]} to {batch[-1]}: {err}")
                     self.conn.rollback()
-            
+
+            self.cursor.execute(get_chains_query)
+            chain_ids = [row[0] for row in self.cursor.fetchall()]
+
+            for chain_id in chain_ids:
+                watermark = self.get_watermark(chain_id, STAGE_RELAY_ANALYSIS) or 0
+
+                self.cursor.execute(get_new_fill_ids_query, (chain_id, watermark))
+                new_fill_ids = [row[0] for row in self.cursor.fetchall()]
+                print(f"Chain {chain_id}: {len(new_fill_ids)} new fills after fill id {watermark}")
+
+                for i in range(0, len(new_fill_ids), batch_size):
+                    batch = new_fill_ids[i:i+batch_size]
+                    low, high = batch[0] - 1, batch[-1]
+                    try:
+                        self.cursor.execute(self.new_fills_query, (chain_id, low, high))
+                        inserted = self.cursor.rowcount
+                        self.cursor.execute(record_pending_query, (chain_id, low, high))
+                        pending = self.cursor.rowcount
+                        self.advance_watermark(chain_id, STAGE_RELAY_ANALYSIS, high)
+                        total_inserted += inserted
+                        print(f"Inserted {inserted} rows in this batch, {pending} fills pending. Total inserted: {total_inserted}")
+                    except mysql.connector.Error as err:
+                        # The watermark stays put so the next run starts again from this batch
+                        print(f"Error processing fills {batch[0]} to {batch[-1]} on chain {chain_id}: {err}")
+                        self.conn.rollback()
+                        break
+
             print(f"Finished processing. Total new rows inserted: {total_inserted}")
+            self.refresh_daily_stats()
+            if self.analytics:
+                self.analytics.refresh()
             return total_inserted
-        
+
         except mysql.connector.Error as err:
             print(f"Error in insert_relay_data: {err}")
             self.conn.rollback()
-            return 0
+            return total_inserted
     
+    def refresh_daily_stats(self):
+        self.ensure_connected()
+        try:
+            watermark = self.get_watermark(DAILY_STATS_CHAIN_ID, STAGE_DAILY_STATS) or 0
+
+            self.cursor.execute("SELECT MAX(id) FROM relay_analysis_results")
+            high = self.cursor.fetchone()[0]
+            if high is None or high <= watermark:
+                print("Daily stats are up to date")
+                return 0
+
+            self.cursor.execute(self.daily_stats_touched_dates_query, (watermark, high))
+            dates = [row[0] for row in self.cursor.fetchall()]
+
+            # Days are rebuilt whole so late fills for an already rolled-up day are counted
+            placeholders = ', '.join(['%s'] * len(dates))
+            self.cursor.execute(f"DELETE FROM relay_daily_stats WHERE fill_date IN ({placeholders})", dates)
+            self.cursor.execute(self.daily_stats_rollup_query.format(condition=f"fill_date IN ({placeholders})"), dates)
+            self.advance_watermark(DAILY_STATS_CHAIN_ID, STAGE_DAILY_STATS, high)
+            print(f"Rebuilt daily stats for {len(dates)} days up to result id {high}")
+            return len(dates)
+
+        except mysql.connector.Error as err:
+            print(f"Error refreshing daily stats: {err}")
+            self.conn.rollback()
+            return 0
+
+    def refresh_relayer_daily_stats(self):
+        self.ensure_connected()
+        try:
+            # Today is kept in the rollup, though outside the query window, so it is complete once it enters the window
+            self.cursor.execute("SELECT CURDATE() - INTERVAL 7 DAY")
+            window_start = self.cursor.fetchone()[0]
+
+            watermark = self.get_watermark(DAILY_STATS_CHAIN_ID, STAGE_RELAYER_DAILY_STATS) or 0
+
+            self.cursor.execute("SELECT MAX(id) FROM relay_analysis_results")
+            high = self.cursor.fetchone()[0] or watermark
+
+            self.cursor.execute(self.relayer_daily_stats_touched_dates_query, (watermark, high, window_start))
+            dates = {row[0] for row in self.cursor.fetchall()}
+            # Days whose fee_data was refetched
+            self.cursor.execute("SELECT fill_date FROM relayer_daily_stats_dirty WHERE fill_date >= %s", (window_start,))
+            dates.update(row[0] for row in self.cursor.fetchall())
+            dates = sorted(dates)
+
+            # Days that left the 7-day window
+            self.cursor.execute("DELETE FROM relayer_daily_stats WHERE fill_date < %s", (window_start,))
+            self.cursor.execute("DELETE FROM relayer_daily_stats_dirty WHERE fill_date < %s", (window_start,))
+
+            if dates:
+                placeholders = ', '.join(['%s'] * len(dates))
+                self.cursor.execute(f"DELETE FROM relayer_daily_stats WHERE fill_date IN ({placeholders})", dates)
+                self.cursor.execute(self.relayer_daily_stats_rollup_query.format(condition=f"fill_date IN ({placeholders})"), dates)
+                self.cursor.execute(self.relayer_daily_fee_stats_rollup_query.format(condition=f"rar.fill_date IN ({placeholders})"), dates)
+                self.cursor.execute(f"DELETE FROM relayer_daily_stats_dirty WHERE fill_date IN ({placeholders})", dates)
+
+            self.advance_watermark(DAILY_STATS_CHAIN_ID, STAGE_RELAYER_DAILY_STATS, high)
+            print(f"Rebuilt relayer daily stats for {len(dates)} days since {window_start}")
+            return True
+
+        except mysql.connector.Error as err:
+            print(f"Error refreshing relayer daily stats: {err}")
+            self.conn.rollback()
+            return False
+
+    def table_exists(self, table):
+        self.cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.tables
+            WHERE table_schema = DATABASE() AND table_name = %s
+        """, (table,))
+        return self.cursor.fetchone()[0] > 0
+
+    def swap_in_table(self, table, build_queries):
+        # Build into a shadow table and RENAME it over the live one in a single atomic
+        # statement, so readers see either the previous or the new contents, never a partial one
+        shadow, retired = f"{table}_new", f"{table}_old"
+        self.ensure_connected()
+        try:
+            self.cursor.execute(f"DROP TABLE IF EXISTS {shadow}")
+            self.cursor.execute(f"DROP TABLE IF EXISTS {retired}")
+            for query in build_queries:
+                if isinstance(query, tuple):
+                    statement, rows = query
+                    self.cursor.executemany(statement.format(table=shadow), rows)
+                else:
+                    self.cursor.execute(query.format(table=shadow))
+            self.conn.commit()
+
+            if self.table_exists(table):
+                self.cursor.execute(f"RENAME TABLE {table} TO {retired}, {shadow} TO {table}")
+                self.cursor.execute(f"DROP TABLE {retired}")
+            else:
+                self.cursor.execute(f"RENAME TABLE {shadow} TO {table}")
+            print(f"Swapped refreshed {table} into place")
+            return True
+
+        except mysql.connector.Error as err:
+            print(f"Error refreshing {table}, keeping the current table: {err}")
+            self.conn.rollback()
+            return False
+
     def get_data(self, query):
+        if self.analytics:
+            return self.analytics.get_data(query)
+        self.ensure_connected()
         try:
             self.cursor.execute(query)
             results = self.cursor.fetchall()
@@ -490,19 +791,69 @@ class DatabaseOperations:
             print(f"Error getting data: {err}" + query)
             return []
         
+    def stream_data(self, query, params=None, chunk_size=EXPORT_CHUNK_SIZE):
+        # Unbuffered cursor on its own pooled connection: rows stay on the server until fetched,
+        # and consume_results lets an abandoned stream hand the connection back cleanly
+        with database.connection(database.POOL_STREAMING) as conn:
+            cursor = conn.cursor(buffered=False)
+            try:
+                cursor.execute(query, params or ())
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield cursor.description, rows
+            finally:
+                cursor.close()
+
+    def export_data(self, query, filename, file_format='csv', params=None, chunk_size=EXPORT_CHUNK_SIZE):
+        from export_writers import write_csv_chunks, write_parquet_chunks
+
+        writers = {'csv': write_csv_chunks, 'parquet': write_parquet_chunks}
+        try:
+            total = writers[file_format](self.stream_data(query, params, chunk_size), filename)
+        # Arrow errors subclass OSError, ValueError and TypeError
+        except (mysql.connector.Error, OSError, ValueError, TypeError) as err:
+            print(f"Error exporting data to {filename}: {err}")
+            return 0
+
+        if total:
+            print(f"Exported {total} rows to {filename}")
+        else:
+            print(f"No data to write to {filename}")
+        return total
+
+    def export_table(self, table, file_format='csv', chunk_size=EXPORT_CHUNK_SIZE):
+        return self.export_data(f"SELECT * FROM {table}", f"{table}.{file_format}", file_format, chunk_size=chunk_size)
+
     def analyze_relay_performance(self):
         return self.get_data(self.general_performance_query)
     
     def get_daily_data(self):
         return self.get_data(self.general_daily_data_query)
     
+    def insert_rows_query(self, columns):
+        return f"INSERT INTO {{table}} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+
     def process_target_combo(self):
-        self.execute_query("truncate table target_combo")
-        self.execute_query(self.target_combo_query)
+        if self.analytics:
+            rows = self.analytics.target_combo_rows()
+            self.swap_in_table('target_combo', [
+                "CREATE TABLE {table} LIKE target_combo",
+                (self.insert_rows_query(TARGET_COMBO_COLUMNS), rows)
+            ])
+        else:
+            self.swap_in_table('target_combo', ["CREATE TABLE {table} LIKE target_combo", self.target_combo_query])
         return self.get_data("""SELECT * FROM target_combo""")
     
     def process_target_relayer_combo(self):
-        self.execute_query("DROP TABLE IF EXISTS target_relayer_combo;")
-        self.execute_query(self.target_relayer_combo_query)
+        if self.analytics:
+            rows = self.analytics.target_relayer_combo_rows()
+            self.swap_in_table('target_relayer_combo', [
+                self.target_relayer_combo_table,
+                (self.insert_rows_query(TARGET_RELAYER_COMBO_COLUMNS), rows)
+            ])
+        elif self.refresh_relayer_daily_stats():
+            self.swap_in_table('target_relayer_combo', [self.target_relayer_combo_query])
         return self.get_data("""SELECT * FROM target_relayer_combo""")
     
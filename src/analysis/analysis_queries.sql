@@ -43,21 +43,16 @@ INSERT INTO target_combo (origin_chain_id, destination_chain_id, input_symbol, o
 WITH combo_stats AS (
     WITH daily_stats AS (
         SELECT 
-            DATE(fill_block_time) AS date,
+            fill_date AS date,
             origin_chain_id, destination_chain_id, input_symbol, output_symbol,
-            SUM(output_amount_usd) AS daily_volume_usd,
-            SUM(input_amount_usd - output_amount_usd - gas_fee * 2700) AS daily_profit_usd,
-            CASE 
-                WHEN input_amount_usd < 1000 THEN '0-1k'
-                WHEN input_amount_usd < 10000 THEN '1k-10k'
-                WHEN input_amount_usd < 100000 THEN '10k-100k'
-                ELSE '100k+'
-            END AS amount_range,
-            COUNT(*) as transaction_count,
-            AVG(relay_time) AS avg_relay_time_seconds,
-            MAX(input_amount_usd) AS max_transaction_size_usd
-        FROM relay_analysis_results
-        GROUP BY DATE(fill_block_time), origin_chain_id, destination_chain_id, input_symbol, output_symbol, amount_range
+            SUM(volume_usd) AS daily_volume_usd,
+            SUM(profit_usd) AS daily_profit_usd,
+            amount_range,
+            SUM(transaction_count) as transaction_count,
+            SUM(relay_time_sum) / SUM(transaction_count) AS avg_relay_time_seconds,
+            MAX(max_input_amount_usd) AS max_transaction_size_usd
+        FROM relay_daily_stats
+        GROUP BY fill_date, origin_chain_id, destination_chain_id, input_symbol, output_symbol, amount_range
     )
     SELECT 
         origin_chain_id, 
@@ -103,16 +98,16 @@ WHERE annual_roi > 0
 ORDER BY annual_roi DESC;
 
 --Detailed analysis for priority fee rules and target amount range
-select r.relayer, r.input_amount_usd, r.output_amount_usd, r.gas_fee * 2700 as gas_fee_usd, r.fill_block_time, r.relay_time , 
-r.priority_fee * 2700 as priority,
-r.priority_fee * 2700 / (r.input_amount_usd - r.output_amount_usd) as priority_fee_ratio,
+select r.relayer, r.input_amount_usd, r.output_amount_usd, r.gas_fee_usd, r.fill_block_time, r.relay_time , 
+r.priority_fee_usd as priority,
+r.priority_fee_usd / (r.input_amount_usd - r.output_amount_usd) as priority_fee_ratio,
 f.exclusive_relayer,
 f.transaction_hash
 from relay_analysis_results r 
 join filled_v3_relays f on r.deposit_id = f.deposit_id
 where r.origin_chain_id = '8453' and r.destination_chain_id = 1 and r.input_symbol = 'WETH'
 and r.output_amount_usd > 20000 and r.output_amount_usd < 100000 
-order by DATE(r.fill_block_time) desc, priority_fee_ratio desc;
+order by r.fill_date desc, priority_fee_ratio desc;
 
 
 -- target relayer combo
@@ -135,12 +130,7 @@ WITH combo_totals AS (
             tc.destination_chain_id = rar.destination_chain_id AND
             tc.input_symbol = rar.input_symbol AND
             tc.output_symbol = rar.output_symbol AND
-            tc.amount_range = CASE 
-                WHEN rar.input_amount_usd < 1000 THEN '0-1k'
-                WHEN rar.input_amount_usd < 10000 THEN '1k-10k'
-                WHEN rar.input_amount_usd < 100000 THEN '10k-100k'
-                ELSE '100k+'
-            END
+            tc.amount_range = rar.amount_range
     GROUP BY 
         tc.origin_chain_id,
         tc.destination_chain_id,
@@ -157,10 +147,10 @@ SELECT
     rar.relayer,
     COUNT(*) AS transaction_count,
     (COUNT(*) * 100.0 / ct.total_transactions) AS transaction_percentage,
-    AVG(rar.input_amount_usd - rar.output_amount_usd - rar.gas_fee * 2700) as avg_profit_usd,
-    SUM(rar.input_amount_usd - rar.output_amount_usd - rar.gas_fee * 2700) as total_profit_usd,
-    AVG(rar.input_amount_usd - rar.output_amount_usd - rar.gas_fee * 2700) / AVG(rar.output_amount_usd) AS avg_profit_ratio,
-    SUM(rar.input_amount_usd - rar.output_amount_usd - rar.gas_fee * 2700)/ SUM(rar.output_amount_usd) AS total_profit_ratio
+    AVG(rar.input_amount_usd - rar.output_amount_usd - rar.gas_fee_usd) as avg_profit_usd,
+    SUM(rar.input_amount_usd - rar.output_amount_usd - rar.gas_fee_usd) as total_profit_usd,
+    AVG(rar.input_amount_usd - rar.output_amount_usd - rar.gas_fee_usd) / AVG(rar.output_amount_usd) AS avg_profit_ratio,
+    SUM(rar.input_amount_usd - rar.output_amount_usd - rar.gas_fee_usd)/ SUM(rar.output_amount_usd) AS total_profit_ratio
 FROM 
     target_combo tc
 JOIN 
@@ -169,12 +159,7 @@ JOIN
         tc.destination_chain_id = rar.destination_chain_id AND
         tc.input_symbol = rar.input_symbol AND
         tc.output_symbol = rar.output_symbol AND
-        tc.amount_range = CASE 
-            WHEN rar.input_amount_usd < 1000 THEN '0-1k'
-            WHEN rar.input_amount_usd < 10000 THEN '1k-10k'
-            WHEN rar.input_amount_usd < 100000 THEN '10k-100k'
-            ELSE '100k+'
-        END
+        tc.amount_range = rar.amount_range
 JOIN
     combo_totals ct ON
         tc.origin_chain_id = ct.origin_chain_id AND
@@ -191,7 +176,7 @@ GROUP BY
     rar.relayer,
     ct.total_transactions
 HAVING 
-    SUM(rar.input_amount_usd - rar.output_amount_usd - rar.gas_fee * 2700) > 300
+    SUM(rar.input_amount_usd - rar.output_amount_usd - rar.gas_fee_usd) > 300
 ORDER BY 
     tc.origin_chain_id,
     tc.destination_chain_id,
@@ -240,4 +225,15 @@ CREATE TABLE fee_data_hourly (
     max_deposit_instant DECIMAL(65,0),
     max_deposit_short_delay DECIMAL(65,0),
     recommended_deposit_instant DECIMAL(65,0)
-);
\ No newline at end of file
+);
+
+CREATE TABLE IF NOT EXISTS relay_analysis_pending (
+    fill_id INT NOT NULL,
+    deposit_id INT NOT NULL,
+    destination_chain_id INT NOT NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    first_seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_attempt_at TIMESTAMP NULL,
+    PRIMARY KEY (fill_id),
+    KEY idx_pending_deposit (deposit_id, destination_chain_id)
+);
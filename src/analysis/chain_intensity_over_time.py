@@ -1,13 +1,13 @@
-import mysql.connector
 import pandas as pd
 import matplotlib.pyplot as plt
 from docx import Document
 from docx.shared import Inches
 from io import BytesIO
-import json
+import os
+import sys
 
-with open("database_config.json") as f:
-    db_config = json.load(f)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from frame_loader import load_frame
 
 data_query = """
 SELECT 
@@ -15,64 +15,41 @@ SELECT
     r.destination_chain_id,
     r.input_symbol,
     r.output_symbol,
-    CASE 
-        WHEN r.output_amount_usd < 1000 THEN '0-1000'
-        WHEN r.output_amount_usd < 10000 THEN '1000-10000'
-        WHEN r.output_amount_usd < 100000 THEN '10000-100000'
-        WHEN r.output_amount_usd < 1000000 THEN '100000-1000000'
-        ELSE '1000000+'
-    END AS output_amount_range,
-    DATE(r.fill_block_time) AS date,
-    CASE 
-        WHEN HOUR(r.fill_block_time) < 12 THEN 'AM'
-        ELSE 'PM'
-    END AS half_day,
-    AVG(r.priority_fee * 2700 / (r.input_amount_usd - r.output_amount_usd)) AS avg_priority_fee_ratio
-FROM relay_analysis_results r
+    r.output_amount_range,
+    r.fill_date AS date,
+    r.half_day,
+    SUM(r.priority_fee_ratio_sum) / SUM(r.priority_fee_ratio_count) AS avg_priority_fee_ratio
+FROM relay_daily_stats r
 JOIN target_combo t ON 
     r.origin_chain_id = t.origin_chain_id AND
     r.destination_chain_id = t.destination_chain_id AND
     r.input_symbol = t.input_symbol AND
     r.output_symbol = t.output_symbol
-WHERE r.priority_fee * 2700 / (r.input_amount_usd - r.output_amount_usd) < 1
 GROUP BY 
     r.origin_chain_id,
     r.destination_chain_id,
     r.input_symbol,
     r.output_symbol,
-    output_amount_range,
-    DATE(r.fill_block_time),
-    half_day
+    r.output_amount_range,
+    r.fill_date,
+    r.half_day
+HAVING SUM(r.priority_fee_ratio_count) > 0
 ORDER BY 
     r.origin_chain_id,
     r.destination_chain_id,
     r.input_symbol,
     r.output_symbol,
-    output_amount_range,
-    DATE(r.fill_block_time),
-    half_day
+    r.output_amount_range,
+    r.fill_date,
+    r.half_day
 """
-conn = mysql.connector.connect(**db_config)
-cursor = conn.cursor()
-cursor.execute(data_query)
-data = cursor.fetchall()
-columns = [
-    "origin_chain_id",
-    "destination_chain_id",
-    "input_symbol",
-    "output_symbol",
-    "output_amount_range",
-    "date",
-    "half_day",
-    "avg_priority_fee_ratio",
-]
-df = pd.DataFrame(data, columns=columns)
+df = load_frame(data_query)
 df["datetime"] = pd.to_datetime(df["date"]) + pd.to_timedelta(
     df["half_day"].map({"AM": "00:00:00", "PM": "12:00:00"})
 )
 doc = Document()
 for (origin, dest, input_sym, output_sym), group in df.groupby(
-    ["origin_chain_id", "destination_chain_id", "input_symbol", "output_symbol"]
+    ["origin_chain_id", "destination_chain_id", "input_symbol", "output_symbol"], observed=True
 ):
     plt.figure(figsize=(12, 7))
 
@@ -95,4 +72,3 @@ for (origin, dest, input_sym, output_sym), group in df.groupby(
 
     doc.add_paragraph(f"{origin} to {dest}: {input_sym} -> {output_sym}")
 doc.save("priority_fee_ratio_charts.docx")
-conn.close()
@@ -0,0 +1,190 @@
+import math
+import os
+import sys
+from decimal import Decimal
+import duckdb
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import snapshot_cache
+from frame_loader import load_frame
+from analysis_helper import DatabaseOperations, MYSQL_DATES, TARGET_COMBO_COLUMNS, TARGET_RELAYER_COMBO_COLUMNS
+
+DUCKDB_DATES = {
+    'combo_window_start': "CURRENT_DATE - INTERVAL 8 DAY",
+    'window_start': "CURRENT_DATE - INTERVAL 7 DAY",
+    'today': "CURRENT_DATE",
+}
+
+# The MySQL rollups (relay_daily_stats, relayer_daily_stats) rebuilt as views over the snapshot from the
+# same SELECTs, so general_performance_query and general_daily_data_query run unchanged against them
+RELAY_DAILY_STATS_VIEW = (
+    "CREATE OR REPLACE VIEW relay_daily_stats AS"
+    + DatabaseOperations.daily_stats_rollup_select.format(condition='TRUE')
+)
+
+# MySQL fills the fee_* columns with a second upsert; here the fee rows are left-joined onto all fills
+RELAYER_DAILY_STATS_VIEW = f"""
+    CREATE OR REPLACE VIEW relayer_daily_stats AS
+    WITH all_fills AS ({DatabaseOperations.relayer_daily_stats_rollup_select.format(condition='TRUE')}),
+    fee_fills AS ({DatabaseOperations.relayer_daily_fee_stats_rollup_select.format(condition='TRUE')})
+    SELECT
+        a.*,
+        COALESCE(f.fee_transaction_count, 0) AS fee_transaction_count,
+        COALESCE(f.fee_volume_usd, 0) AS fee_volume_usd,
+        COALESCE(f.fee_profit_usd, 0) AS fee_profit_usd,
+        COALESCE(f.fee_net_profit_usd, 0) AS fee_net_profit_usd,
+        COALESCE(f.fee_relay_time_sum, 0) AS fee_relay_time_sum,
+        COALESCE(f.fee_priority_fee_usd_sum, 0) AS fee_priority_fee_usd_sum
+    FROM all_fills a
+    LEFT JOIN fee_fills f USING (fill_date, origin_chain_id, destination_chain_id, input_symbol, output_symbol, amount_range, relayer)
+"""
+
+class DuckDBAnalytics:
+    target_combo_query = DatabaseOperations.target_combo_select.format(**DUCKDB_DATES)
+    target_relayer_combo_query = DatabaseOperations.target_relayer_combo_select.format(**DUCKDB_DATES)
+
+    def __init__(self, snapshot_dir=snapshot_cache.DEFAULT_SNAPSHOT_DIR):
+        self.snapshot_dir = snapshot_dir
+        self.con = duckdb.connect()
+        self.registered = False
+
+    def connect(self):
+        # The dataset lists the files when it is registered, so a missing snapshot is built first
+        if not os.path.exists(os.path.join(self.snapshot_dir, snapshot_cache.MANIFEST_FILE)):
+            self.refresh()
+        if not snapshot_cache.read_manifest(self.snapshot_dir)['partitions']:
+            print(f"Snapshot in {self.snapshot_dir} has no partitions yet")
+            return False
+        self.register_snapshot()
+        self.con.execute("CREATE OR REPLACE VIEW relay_analysis_results AS SELECT * FROM relay_analysis_snapshot")
+
+        # Small lookup tables come from MySQL once per session, before the views that bind to them
+        self.replace_table('target_combo', load_frame("""
+            SELECT origin_chain_id, destination_chain_id, input_symbol, output_symbol, amount_range FROM target_combo
+        """, categorical=[]))
+        self.replace_table('fee_data', load_frame("""
+            SELECT deposit_id, origin_chain_id, destination_chain_id, lp_fee_pct FROM fee_data
+        """, categorical=[]))
+        self.con.execute(RELAY_DAILY_STATS_VIEW)
+        self.con.execute(RELAYER_DAILY_STATS_VIEW)
+        return True
+
+    def register_snapshot(self):
+        # Scanned through pyarrow, which pushes DuckDB's filters and projections into the Parquet reads
+        self.con.register('relay_analysis_snapshot', snapshot_cache.snapshot_dataset(self.snapshot_dir))
+        self.registered = True
+
+    def refresh(self):
+        written = snapshot_cache.refresh_snapshot(self.snapshot_dir)
+        # Picks up partition files created by this refresh
+        if written and self.registered:
+            self.register_snapshot()
+        return written
+
+    def replace_table(self, name, df):
+        self.con.register(f"{name}_frame", df)
+        self.con.execute(f"CREATE OR REPLACE TABLE {name} AS SELECT * FROM {name}_frame")
+        self.con.unregister(f"{name}_frame")
+
+    def get_data(self, query):
+        try:
+            return self.con.execute(query.strip().rstrip(';')).fetchdf().to_dict('records')
+        except duckdb.Error as err:
+            print(f"Error getting data: {err}" + query)
+            return []
+
+    def target_combo_rows(self):
+        # Kept in DuckDB as well: target_relayer_combo is built from it and get_data reads both back
+        self.con.execute(f"CREATE OR REPLACE TABLE target_combo AS {self.target_combo_query}")
+        return self.con.execute("SELECT * FROM target_combo").fetchall()
+
+    def target_relayer_combo_rows(self):
+        self.con.execute(f"CREATE OR REPLACE TABLE target_relayer_combo AS {self.target_relayer_combo_query}")
+        return self.con.execute("SELECT * FROM target_relayer_combo").fetchall()
+
+    def close(self):
+        self.con.close()
+
+    def rows(self, query):
+        result = self.con.execute(query.strip().rstrip(';'))
+        return [col[0] for col in result.description], result.fetchall()
+
+# (name, MySQL query, DuckDB query, columns identifying a row)
+PARITY_CHECKS = [
+    ('general_performance_query', DatabaseOperations.general_performance_query, DatabaseOperations.general_performance_query, TARGET_COMBO_COLUMNS),
+    ('general_daily_data_query', DatabaseOperations.general_daily_data_query, DatabaseOperations.general_daily_data_query, ['date'] + TARGET_COMBO_COLUMNS),
+    ('target_combo', DatabaseOperations.target_combo_select.format(**MYSQL_DATES), DuckDBAnalytics.target_combo_query, TARGET_COMBO_COLUMNS),
+    ('target_relayer_combo', DatabaseOperations.target_relayer_combo_select.format(**MYSQL_DATES), DuckDBAnalytics.target_relayer_combo_query, TARGET_RELAYER_COMBO_COLUMNS[:6]),
+]
+# MySQL rounds DECIMAL quotients to div_precision_increment (4) places, DuckDB divides in double
+PARITY_TOLERANCE = 1e-4
+
+def keyed_rows(columns, rows, key_columns):
+    key_indexes = [columns.index(column) for column in key_columns]
+    return {tuple(str(row[i]) for i in key_indexes): dict(zip(columns, row)) for row in rows}
+
+def values_match(a, b):
+    if a is None or b is None:
+        return a is None and b is None
+    if isinstance(a, (int, float, Decimal)) and isinstance(b, (int, float, Decimal)):
+        return math.isclose(float(a), float(b), rel_tol=PARITY_TOLERANCE, abs_tol=PARITY_TOLERANCE)
+    return a == b
+
+def parity(snapshot_dir=snapshot_cache.DEFAULT_SNAPSHOT_DIR):
+    db_ops = DatabaseOperations()
+    analytics = DuckDBAnalytics(snapshot_dir)
+    mismatched = []
+    try:
+        db_ops.connect()
+        # Both sides are brought up to the latest result id before comparing
+        db_ops.refresh_daily_stats()
+        db_ops.refresh_relayer_daily_stats()
+        analytics.refresh()
+        if not analytics.connect():
+            print("Nothing to compare: relay_analysis_results is empty")
+            return False
+
+        for name, mysql_query, duckdb_query, key_columns in PARITY_CHECKS:
+            db_ops.cursor.execute(mysql_query.strip().rstrip(';'))
+            mysql_rows = keyed_rows([col[0] for col in db_ops.cursor.description], db_ops.cursor.fetchall(), key_columns)
+            duckdb_rows = keyed_rows(*analytics.rows(duckdb_query), key_columns)
+
+            only_mysql = sorted(set(mysql_rows) - set(duckdb_rows))
+            only_duckdb = sorted(set(duckdb_rows) - set(mysql_rows))
+            differing = sorted(
+                key for key in set(mysql_rows) & set(duckdb_rows)
+                if any(not values_match(value, duckdb_rows[key].get(column)) for column, value in mysql_rows[key].items())
+            )
+            if not (only_mysql or only_duckdb or differing):
+                print(f"[ok] {name}: {len(mysql_rows)} rows")
+                continue
+
+            mismatched.append(name)
+            print(f"[DIFF] {name}: {len(only_mysql)} rows only in MySQL, {len(only_duckdb)} only in DuckDB, {len(differing)} differ")
+            for key in only_mysql[:5]:
+                print(f"   MySQL only: {key}")
+            for key in only_duckdb[:5]:
+                print(f"   DuckDB only: {key}")
+            for key in differing[:5]:
+                columns = [column for column, value in mysql_rows[key].items() if not values_match(value, duckdb_rows[key].get(column))]
+                print(f"   {key}: " + ', '.join(f"{column} {mysql_rows[key][column]} != {duckdb_rows[key].get(column)}" for column in columns))
+    finally:
+        analytics.close()
+        db_ops.close()
+
+    if mismatched:
+        print(f"{len(mismatched)} of {len(PARITY_CHECKS)} analytics queries differ between MySQL and DuckDB: {', '.join(mismatched)}")
+    else:
+        print(f"All {len(PARITY_CHECKS)} analytics queries match between MySQL and DuckDB.")
+    return not mismatched
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="DuckDB analytics over the relay_analysis_results snapshot")
+    parser.add_argument('command', choices=['parity'], help='parity: run the analytics queries on MySQL and DuckDB and diff the rows')
+    parser.add_argument('--dir', default=snapshot_cache.DEFAULT_SNAPSHOT_DIR, help='Snapshot directory')
+    args = parser.parse_args()
+
+    if not parity(args.dir):
+        sys.exit(1)
@@ -1,10 +1,14 @@
 import requests
 from datetime import datetime
-import mysql.connector
 from mysql.connector import Error
 import logging
 import time
-import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import database
+from analysis_helper import DatabaseOperations
 
 
 logging.basicConfig(
@@ -14,10 +18,6 @@ logging.basicConfig(
 )
 
 
-with open("database_config.json") as f:
-    db_config = json.load(f)
-
-
 API_URL = "https://app.across.to/api/suggested-fees"
 
 
@@ -70,32 +70,24 @@ def insert_fee_data(cursor, data, timestamp, params, deposit_id):
 
 def get_token_pairs(cursor):
     cursor.execute("truncate table fee_data")
-    query = """
-        SELECT r.origin_chain_id, r.destination_chain_id, r.input_token, r.output_token, r.deposit_block_time, f.output_amount, r.deposit_id
-            FROM relay_analysis_results r 
-            JOIN filled_v3_relays f ON f.origin_chain_id = r.origin_chain_id 
-                AND f.chain_id = r.destination_chain_id 
-                AND f.input_token = r.input_token 
-                AND f.output_token = r.output_token 
-                AND f.deposit_id = r.deposit_id
-            JOIN target_combo tc ON r.origin_chain_id = tc.origin_chain_id
-                AND r.destination_chain_id = tc.destination_chain_id
-                AND r.input_symbol = tc.input_symbol
-                AND r.output_symbol = tc.output_symbol
-            WHERE DATE(r.fill_block_time) >= DATE_SUB(CURDATE(), INTERVAL 7 DAY)
-            AND (
-                (tc.amount_range = '1k-10k' AND r.output_amount_usd > 1000 AND r.output_amount_usd < 10000)
-                OR
-                (tc.amount_range = '10k-100k' AND r.output_amount_usd > 10000 AND r.output_amount_usd < 100000)
-            )
-    """
-    cursor.execute(query)
+    cursor.execute(DatabaseOperations.fee_token_pairs_query)
     return cursor.fetchall()
 
 
+def mark_relayer_stats_dirty(cursor):
+    # fee_data was rebuilt, so every day the rollup keeps (the 7-day window plus today) needs recomputing
+    cursor.execute("""
+        INSERT IGNORE INTO relayer_daily_stats_dirty (fill_date)
+        SELECT DISTINCT fill_date FROM relay_analysis_results
+        WHERE fill_date >= CURDATE() - INTERVAL 7 DAY
+    """)
+
+
 def main():
+    connection = None
+    cursor = None
     try:
-        connection = mysql.connector.connect(**db_config)
+        connection = database.get_connection()
         if connection.is_connected():
             cursor = connection.cursor()
 
@@ -144,13 +136,17 @@ def main():
                         f"No data fetched for {deposit_block_time} - {input_token} to {output_token}"
                     )
 
+            mark_relayer_stats_dirty(cursor)
+            connection.commit()
+
     except Error as e:
         logging.error(f"Database error: {e}")
     finally:
-        if connection.is_connected():
+        if cursor is not None:
             cursor.close()
+        if connection is not None:
             connection.close()
-            logging.info("MySQL connection is closed")
+            logging.info("MySQL connection returned to pool")
 
 
 if __name__ == "__main__":
@@ -1,18 +1,15 @@
 
-import mysql.connector
 import pandas as pd
 import matplotlib.pyplot as plt
 from docx import Document
 from docx.shared import Inches
 import io
 import numpy as np
-import json
+import os
+import sys
 
-with open("database_config.json") as f:
-    db_config = json.load(f)
-
-conn = mysql.connector.connect(**db_config)
-cursor = conn.cursor()
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from frame_loader import load_frame
 
 query = """
 SELECT 
@@ -20,9 +17,9 @@ SELECT
     r.destination_chain_id,
     r.input_symbol,
     r.output_symbol,
-    r.gas_fee * 2700 AS gas_fee_in_usd,
-    r.priority_fee * 2700 / (r.input_amount_usd - r.output_amount_usd) AS priority_fee_ratio,
-    r.input_amount_usd - r.output_amount_usd - r.gas_fee * 2700 AS net_profit,
+    r.gas_fee_usd AS gas_fee_in_usd,
+    r.priority_fee_usd / (r.input_amount_usd - r.output_amount_usd) AS priority_fee_ratio,
+    r.input_amount_usd - r.output_amount_usd - r.gas_fee_usd AS net_profit,
     r.input_amount_usd,
     r.output_amount_usd
 FROM relay_analysis_results r
@@ -31,10 +28,10 @@ JOIN target_combo t ON
     r.destination_chain_id = t.destination_chain_id AND
     r.input_symbol = t.input_symbol AND
     r.output_symbol = t.output_symbol
-WHERE r.priority_fee * 2700 / (r.input_amount_usd - r.output_amount_usd) < 1
+WHERE r.priority_fee_usd / (r.input_amount_usd - r.output_amount_usd) < 1
 """
 
-df = pd.read_sql(query, conn)
+df = load_frame(query)
 def find_optimal_percentile(data):
     best_percentile = 0
     max_expected_profit = float('-inf')
@@ -61,7 +58,7 @@ def find_optimal_percentile(data):
 doc = Document()
 doc.add_heading('Optimal Priority Fee Analysis Report', 0)
 
-combos = df.groupby(['origin_chain_id', 'destination_chain_id', 'input_symbol', 'output_symbol'])
+combos = df.groupby(['origin_chain_id', 'destination_chain_id', 'input_symbol', 'output_symbol'], observed=True)
 
 log_ranges = [(10**i, 10**(i+1)) for i in range(0, 6)]  
 
@@ -110,7 +107,4 @@ for name, group in combos:
 
 doc.save('optimal_priority_fee_analysis.docx')
 
-cursor.close()
-conn.close()
-
 print("Report generated: optimal_priority_fee_analysis.docx")
\ No newline at end of file
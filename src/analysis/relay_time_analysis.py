@@ -1,4 +1,3 @@
-import mysql.connector
 import matplotlib.pyplot as plt
 from datetime import datetime
 from docx import Document
@@ -7,49 +6,34 @@ import io
 import numpy as np
 from collections import defaultdict
 import pandas as pd
-import json
-
-with open("database_config.json") as f:
-    db_config = json.load(f)
-
-
-query = """
-SELECT 
-    rar.origin_chain_id,
-    rar.destination_chain_id,
-    rar.input_symbol,
-    rar.output_symbol,
-    CASE 
-        WHEN rar.input_amount_usd < 1000 THEN '0-1k'
-        WHEN rar.input_amount_usd < 10000 THEN '1k-10k'
-        WHEN rar.input_amount_usd < 100000 THEN '10k-100k'
-        ELSE '100k+'
-    END AS amount_range,
-    rar.relayer,
-    rar.relay_time,
-    rar.fill_block_time
-FROM 
-    relay_analysis_results rar
-JOIN 
-    target_relayer_combo trc
-    ON rar.origin_chain_id = trc.origin_chain_id
-    AND rar.destination_chain_id = trc.destination_chain_id
-    AND rar.input_symbol = trc.input_symbol
-    AND rar.output_symbol = trc.output_symbol
-    AND rar.relayer = trc.relayer
-    AND CASE 
-        WHEN rar.input_amount_usd < 1000 THEN '0-1k'
-        WHEN rar.input_amount_usd < 10000 THEN '1k-10k'
-        WHEN rar.input_amount_usd < 100000 THEN '10k-100k'
-        ELSE '100k+'
-    END = trc.amount_range
-"""
-
-
-conn = mysql.connector.connect(**db_config)
-cursor = conn.cursor()
-cursor.execute(query)
-results = cursor.fetchall()
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from frame_loader import load_frame
+from snapshot_cache import read_snapshot, combo_filters
+
+KEY_COLUMNS = ["origin_chain_id", "destination_chain_id", "input_symbol", "output_symbol", "amount_range", "relayer"]
+
+target_relayer_combo = load_frame(
+    "SELECT origin_chain_id, destination_chain_id, input_symbol, output_symbol, amount_range, relayer FROM target_relayer_combo",
+    categorical=[],
+)
+combos = target_relayer_combo[KEY_COLUMNS[:4]].drop_duplicates()
+
+results = []
+if not combos.empty:
+    fills = read_snapshot(
+        columns=KEY_COLUMNS + ["relay_time", "fill_block_time"],
+        filters=combo_filters(
+            combos.itertuples(index=False, name=None),
+            [("relayer", "in", target_relayer_combo["relayer"].unique().tolist())],
+        ),
+    )
+    results = list(
+        fills.merge(target_relayer_combo, on=KEY_COLUMNS)[KEY_COLUMNS + ["relay_time", "fill_block_time"]]
+        .itertuples(index=False, name=None)
+    )
 
 
 doc = Document()
@@ -137,8 +121,4 @@ for general_combo, specific_combos in general_combos.items():
 
 doc.save("relay_time_analysis.docx")
 
-
-cursor.close()
-conn.close()
-
 print("Relay time analysis has been saved to relay_time_analysis.docx")
@@ -1,16 +1,16 @@
-import mysql.connector
 import pandas as pd
 import matplotlib.pyplot as plt
-from datetime import timedelta
 import numpy as np
 from decimal import Decimal
 from docx import Document
 from docx.shared import Inches
 from io import BytesIO
-import json
+import os
+import sys
 
-with open("database_config.json") as f:
-    db_config = json.load(f)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from snapshot_cache import read_snapshot, combo_filters
+from capital_simulation import simulate_funds
 
 
 def calculate_max_fund(df):
@@ -19,27 +19,7 @@ def calculate_max_fund(df):
     return Decimal(str(np.nanmax(window_sums.values + np.roll(window_sums.values, 1))))
 
 
-def simulate(initial_fund, df):
-    available_fund = initial_fund
-    total_profit = Decimal("0")
-    missed_orders = 0
-    missed_profit = Decimal("0")
-    last_refill_time = df["fill_block_time"].iloc[0]
-
-    for _, row in df.iterrows():
-        if row["fill_block_time"] - last_refill_time >= timedelta(hours=2):
-            available_fund = initial_fund
-            last_refill_time = row["fill_block_time"]
-
-        if available_fund >= row["output_amount_usd"]:
-            available_fund -= row["output_amount_usd"]
-            total_profit += row["profit"]
-        else:
-            missed_orders += 1
-            missed_profit += row["profit"]
-
-    return total_profit, missed_orders, missed_profit
-
+RELAYER = "0x07aE8551Be970cB1cCa11Dd7a11F47Ae82e70E67"
 
 trade_pairs = [
     (1, 8453, "USDC", "USDC"),
@@ -59,45 +39,39 @@ doc = Document()
 doc.add_heading("Relayer Analysis", 0)
 
 
-conn = mysql.connector.connect(**db_config)
-cursor = conn.cursor()
-
 for origin_chain, dest_chain, input_sym, output_sym in trade_pairs:
 
-    query = f"""
-    SELECT output_amount_usd, fill_block_time, input_amount_usd, gas_fee
-    FROM relay_analysis_results
-    WHERE origin_chain_id = '{origin_chain}' 
-    AND destination_chain_id = '{dest_chain}' 
-    AND input_symbol = '{input_sym}' 
-    AND output_symbol = '{output_sym}'
-    AND relayer = '0x07aE8551Be970cB1cCa11Dd7a11F47Ae82e70E67'
-    ORDER BY fill_block_time
-    """
-
-    cursor.execute(query)
-    data = cursor.fetchall()
-
-    if not data:
-        continue
-
-    df = pd.DataFrame(
-        data,
-        columns=["output_amount_usd", "fill_block_time", "input_amount_usd", "gas_fee"],
+    # simulate_funds() works in Decimal, so keep DECIMAL columns exact
+    df = read_snapshot(
+        columns=["output_amount_usd", "fill_block_time", "input_amount_usd", "gas_fee_usd", "relayer"],
+        # Addresses are stored as the chain returned them, checksummed or lowercase
+        filters=combo_filters(
+            [(origin_chain, dest_chain, input_sym, output_sym)],
+            [("relayer", "in", [RELAYER, RELAYER.lower()])],
+        ),
+        exact_decimal=True,
     )
+    df = df.sort_values("fill_block_time", kind="stable").reset_index(drop=True)
+
+    if df.empty:
+        continue
 
     df["profit"] = (
-        df["input_amount_usd"] - df["output_amount_usd"] - df["gas_fee"] * 2700
+        df["input_amount_usd"] - df["output_amount_usd"] - df["gas_fee_usd"]
     )
 
-    df["fill_block_time"] = pd.to_datetime(df["fill_block_time"])
-
     max_fund = calculate_max_fund(df)
     fund_levels = [max_fund * Decimal(str(1 - i * 0.05)) for i in range(20)]
     results = []
 
-    for fund in fund_levels:
-        total_profit, missed_orders, missed_profit = simulate(fund, df)
+    simulations = simulate_funds(
+        fund_levels,
+        df["fill_block_time"].to_numpy(),
+        df["output_amount_usd"].to_numpy(),
+        df["profit"].to_numpy(),
+    )
+
+    for fund, (total_profit, missed_orders, missed_profit) in zip(fund_levels, simulations):
         results.append(
             {
                 "fund": fund,
@@ -152,7 +126,5 @@ for origin_chain, dest_chain, input_sym, output_sym in trade_pairs:
         "The graph shows the profit to allocation ratio versus the initial fund. The peak of this curve represents the most efficient use of capital."
     )
 
-cursor.close()
-conn.close()
 
 doc.save("relayer_analysis.docx")
@@ -1,18 +1,18 @@
-import mysql.connector
 import pandas as pd
 import matplotlib.pyplot as plt
-from datetime import timedelta
 import numpy as np
 from decimal import Decimal
 from docx import Document
 from docx.shared import Inches
 from io import BytesIO
 import csv
-import json
+import os
+import sys
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from snapshot_cache import read_snapshot, combo_filters, amount_filters
+from capital_simulation import simulate_funds
 
-with open("database_config.json") as f:
-    db_config = json.load(f)
 
 
 def calculate_max_fund(df):
@@ -21,28 +21,6 @@ def calculate_max_fund(df):
     return Decimal(str(np.nanmax(window_sums.values + np.roll(window_sums.values, 1))))
 
 
-def simulate(initial_fund, df):
-    available_fund = initial_fund
-    total_profit = Decimal("0")
-    missed_orders = 0
-    missed_profit = Decimal("0")
-    last_refill_time = df["fill_block_time"].iloc[0]
-
-    for _, row in df.iterrows():
-        if row["fill_block_time"] - last_refill_time >= timedelta(hours=2):
-            available_fund = initial_fund
-            last_refill_time = row["fill_block_time"]
-
-        if available_fund >= row["output_amount_usd"]:
-            available_fund -= row["output_amount_usd"]
-            total_profit += row["profit"]
-        else:
-            missed_orders += 1
-            missed_profit += row["profit"]
-
-    return total_profit, missed_orders, missed_profit
-
-
 trade_pairs = [
     (1, 8453, "USDC", "USDC", 10000, 100000),
     (1, 42161, "USDC", "USDC", 10000, 100000),
@@ -78,9 +56,6 @@ with open(csv_filename, "w", newline="") as csvfile:
     )
 
 
-conn = mysql.connector.connect(**db_config)
-cursor = conn.cursor()
-
 for (
     origin_chain,
     dest_chain,
@@ -90,37 +65,33 @@ for (
     max_amount,
 ) in trade_pairs:
 
-    query = f"""
-    SELECT output_amount_usd, fill_block_time, input_amount_usd, gas_fee
-    FROM relay_analysis_results
-    WHERE output_amount_usd BETWEEN {min_amount} AND {max_amount}
-    AND origin_chain_id = '{origin_chain}' 
-    AND destination_chain_id = '{dest_chain}' 
-    AND input_symbol = '{input_sym}' 
-    AND output_symbol = '{output_sym}'
-    ORDER BY fill_block_time
-    """
-
-    cursor.execute(query)
-    data = cursor.fetchall()
-
-    df = pd.DataFrame(
-        data,
-        columns=["output_amount_usd", "fill_block_time", "input_amount_usd", "gas_fee"],
+    # simulate_funds() works in Decimal, so keep DECIMAL columns exact
+    df = read_snapshot(
+        columns=["output_amount_usd", "fill_block_time", "input_amount_usd", "gas_fee_usd"],
+        filters=combo_filters(
+            [(origin_chain, dest_chain, input_sym, output_sym)],
+            amount_filters("output_amount_usd", min_amount, max_amount),
+        ),
+        exact_decimal=True,
     )
+    df = df.sort_values("fill_block_time", kind="stable").reset_index(drop=True)
 
     df["profit"] = (
-        df["input_amount_usd"] - df["output_amount_usd"] - df["gas_fee"] * 2700
+        df["input_amount_usd"] - df["output_amount_usd"] - df["gas_fee_usd"]
     )
 
-    df["fill_block_time"] = pd.to_datetime(df["fill_block_time"])
-
     max_fund = calculate_max_fund(df)
     fund_levels = [max_fund * Decimal(str(1 - i * 0.05)) for i in range(20)]
     results = []
 
-    for fund in fund_levels:
-        total_profit, missed_orders, missed_profit = simulate(fund, df)
+    simulations = simulate_funds(
+        fund_levels,
+        df["fill_block_time"].to_numpy(),
+        df["output_amount_usd"].to_numpy(),
+        df["profit"].to_numpy(),
+    )
+
+    for fund, (total_profit, missed_orders, missed_profit) in zip(fund_levels, simulations):
         profit_ratio = total_profit / fund if fund > 0 else Decimal("0")
         results.append(
             {
@@ -203,8 +174,6 @@ for (
     )
 
 
-cursor.close()
-conn.close()
 
 
 doc.save("trade_pair_analysis.docx")
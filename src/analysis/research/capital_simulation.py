@@ -0,0 +1,50 @@
+import numpy as np
+from decimal import Decimal
+
+REFILL_INTERVAL = np.timedelta64(2, "h")
+
+
+def refill_windows(fill_times, interval=REFILL_INTERVAL):
+    # A window opens at a fill and holds every later fill less than `interval` after it;
+    # the first fill past that opens the next one. This only depends on the times, not the fund.
+    starts = []
+    start = 0
+    while start < len(fill_times):
+        starts.append(start)
+        start = int(np.searchsorted(fill_times, fill_times[start] + interval, side="left"))
+    return np.array(starts, dtype=np.int64)
+
+
+def simulate_funds(fund_levels, fill_times, amounts, profits, interval=REFILL_INTERVAL):
+    # Every fund level is simulated at once. Windows are independent (the fund is refilled at each
+    # window start), so step k takes the k-th fill of every window for every fund level together.
+    # Values stay Decimal in object arrays and profits are summed in fill order, so the results
+    # match a row-by-row Decimal walk exactly.
+    fill_times = np.asarray(fill_times)
+    amounts = np.asarray(amounts, dtype=object)
+    profits = np.asarray(profits, dtype=object)
+    funds = np.empty(len(fund_levels), dtype=object)
+    funds[:] = list(fund_levels)
+
+    starts = refill_windows(fill_times, interval)
+    lengths = np.diff(np.append(starts, len(fill_times)))
+    order = np.argsort(-lengths, kind="stable")
+    starts, lengths = starts[order], lengths[order]
+
+    available = np.empty((len(funds), len(starts)), dtype=object)
+    available[:] = funds[:, None]
+    taken = np.zeros((len(funds), len(fill_times)), dtype=bool)
+
+    for k in range(int(lengths.max()) if len(lengths) else 0):
+        active = int(np.count_nonzero(lengths > k))
+        idx = starts[:active] + k
+        window_funds = available[:, :active]
+        fill_amounts = np.broadcast_to(amounts[idx], window_funds.shape)
+        fits = (window_funds >= fill_amounts).astype(bool)
+        window_funds[fits] = window_funds[fits] - fill_amounts[fits]
+        taken[:, idx] = fits
+
+    return [
+        (sum(profits[row], Decimal("0")), int(np.count_nonzero(~row)), sum(profits[~row], Decimal("0")))
+        for row in taken
+    ]
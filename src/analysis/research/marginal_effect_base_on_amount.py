@@ -1,66 +1,45 @@
-import mysql.connector
 import matplotlib.pyplot as plt
 from matplotlib.ticker import FuncFormatter
 from docx import Document
 from docx.shared import Inches
 import io
 import numpy as np
-import json
+import os
+import sys
 
-with open("database_config.json") as f:
-    config = json.load(f)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from frame_loader import load_frame
+from snapshot_cache import read_snapshot, combo_filters, amount_filters
 
 
-query = """
-SELECT 
-    r.input_symbol,
-    r.output_symbol,
-    r.origin_chain_id,
-    r.destination_chain_id,
-    r.output_amount_usd * 4 AS amount,
-    (input_amount_usd - output_amount_usd - gas_fee * 2700) / output_amount_usd / 4 AS profit_rate,
-    (input_amount_usd - output_amount_usd - gas_fee * 2700) AS profit
+combos = load_frame("""
+SELECT DISTINCT
+    origin_chain_id,
+    destination_chain_id,
+    input_symbol,
+    output_symbol
 FROM 
-    relay_analysis_results r
-INNER JOIN (
-    SELECT DISTINCT
-        origin_chain_id,
-        destination_chain_id,
-        input_symbol,
-        output_symbol
-    FROM 
-        target_combo
-) tc ON 
-    r.origin_chain_id = tc.origin_chain_id AND
-    r.destination_chain_id = tc.destination_chain_id AND
-    r.input_symbol = tc.input_symbol AND
-    r.output_symbol = tc.output_symbol
-WHERE
-    input_amount_usd - output_amount_usd - gas_fee * 2700 > 0 and output_amount_usd > 10000
-ORDER BY 
-    r.input_symbol,r. output_symbol, r.origin_chain_id, r.destination_chain_id, output_amount_usd;
-"""
-
-cnx = mysql.connector.connect(**config)
-cursor = cnx.cursor()
-cursor.execute(query)
-
-
-results = cursor.fetchall()
-
-
-cursor.close()
-cnx.close()
-
-
-data = {}
-for row in results:
-    key = (row[0], row[1], row[2], row[3])
-    if key not in data:
-        data[key] = {"amount": [], "profit": [], "profit_rate": []}
-    data[key]["amount"].append(row[4])
-    data[key]["profit"].append(row[6])
-    data[key]["profit_rate"].append(row[5])
+    target_combo
+""", categorical=[])
+
+if combos.empty:
+    raise SystemExit("target_combo is empty")
+
+df = read_snapshot(
+    columns=["input_symbol", "output_symbol", "origin_chain_id", "destination_chain_id", "input_amount_usd", "output_amount_usd", "gas_fee_usd"],
+    filters=combo_filters(combos.itertuples(index=False, name=None), amount_filters("output_amount_usd", low=10000)),
+)
+
+df["profit"] = df["input_amount_usd"] - df["output_amount_usd"] - df["gas_fee_usd"]
+df = df[(df["profit"] > 0) & (df["output_amount_usd"] > 10000)].copy()
+df["amount"] = df["output_amount_usd"] * 4
+df["profit_rate"] = df["profit"] / df["output_amount_usd"] / 4
+df = df.sort_values(["input_symbol", "output_symbol", "origin_chain_id", "destination_chain_id", "output_amount_usd"], kind="stable")
+
+data = {
+    key: {"amount": group["amount"].to_numpy(), "profit": group["profit"].to_numpy(), "profit_rate": group["profit_rate"].to_numpy()}
+    for key, group in df.groupby(["input_symbol", "output_symbol", "origin_chain_id", "destination_chain_id"], observed=True, sort=False)
+}
 
 
 doc = Document()
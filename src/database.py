@@ -0,0 +1,116 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+import mysql.connector
+from mysql.connector import pooling
+
+DATABASE_CONFIG_FILE = 'database_config.json'
+DEFAULT_POOL_SIZE = 8
+POOL_WAIT_SECONDS = 0.5
+POOL_WAIT_TIMEOUT_SECONDS = 300
+RECONNECT_ATTEMPTS = 3
+RECONNECT_DELAY_SECONDS = 2
+
+POOL_DEFAULT = 'default'
+POOL_LOAD_DATA = 'load_data'
+POOL_STREAMING = 'streaming'
+# Connection options per pool; callers pick one of these instead of passing options,
+# so the process never holds more than this many pools
+POOL_OPTIONS = {
+    POOL_DEFAULT: {},
+    POOL_LOAD_DATA: {'allow_local_infile': True},
+    POOL_STREAMING: {'consume_results': True},
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+_pool_size = None
+
+def load_db_config(filename=DATABASE_CONFIG_FILE):
+    try:
+        with open(filename, 'r') as config_file:
+            config = json.load(config_file)
+    except FileNotFoundError:
+        print(f"Error: {filename} file not found.")
+        raise
+    except json.JSONDecodeError:
+        print(f"Error: {filename} is not a valid JSON file.")
+        raise
+
+    # Accept both {"database": {...}} and a flat connection config
+    if isinstance(config.get('database'), dict):
+        config = config['database']
+    return dict(config)
+
+def configure(pool_size=None):
+    global _pool_size
+    with _pools_lock:
+        _pool_size = pool_size
+
+def get_pool(name=POOL_DEFAULT):
+    if name not in POOL_OPTIONS:
+        raise ValueError(f"Unknown connection pool: {name}")
+    with _pools_lock:
+        if name not in _pools:
+            config = load_db_config()
+            config_pool_size = config.pop('pool_size', DEFAULT_POOL_SIZE)
+            pool_size = _pool_size or config_pool_size
+            _pools[name] = pooling.MySQLConnectionPool(
+                pool_name=f"relayer_pool_{name}",
+                pool_size=pool_size,
+                pool_reset_session=True,
+                **{**config, **POOL_OPTIONS[name]}
+            )
+            print(f"Created MySQL connection pool {name} of size {pool_size}")
+        return _pools[name]
+
+def ensure_connected(conn):
+    try:
+        conn.ping(reconnect=True, attempts=RECONNECT_ATTEMPTS, delay=RECONNECT_DELAY_SECONDS)
+        return True
+    except mysql.connector.Error as err:
+        print(f"MySQL reconnect failed: {err}")
+        return False
+
+def get_connection(pool_name=POOL_DEFAULT):
+    pool = get_pool(pool_name)
+    deadline = time.monotonic() + POOL_WAIT_TIMEOUT_SECONDS
+
+    while True:
+        try:
+            conn = pool.get_connection()
+        except pooling.PoolError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(POOL_WAIT_SECONDS)
+            continue
+
+        if ensure_connected(conn):
+            return conn
+        conn.close()
+        if time.monotonic() >= deadline:
+            raise mysql.connector.Error("Could not get a live connection from the pool")
+        time.sleep(RECONNECT_DELAY_SECONDS)
+
+@contextmanager
+def connection(pool_name=POOL_DEFAULT):
+    conn = get_connection(pool_name)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+@contextmanager
+def cursor(commit=False, **cursor_options):
+    with connection() as conn:
+        cur = conn.cursor(**cursor_options)
+        try:
+            yield cur
+            if commit:
+                conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
@@ -1,198 +1,270 @@
 import mysql.connector
-import json
+import os
+import tempfile
 from datetime import datetime
+import database
+
+STAGE_FILLS = 'filled_v3_relays'
+STAGE_DEPOSITS = 'v3_funds_deposited'
+STAGE_FILL_TRANSACTIONS = 'fill_transactions'
+STAGE_DEPOSIT_TRANSACTIONS = 'deposit_transactions'
+
+FILL_COLUMNS = (
+    'chain_id', 'input_token', 'output_token', 'input_amount', 'output_amount', 'repayment_chain_id',
+    'origin_chain_id', 'deposit_id', 'fill_deadline', 'exclusivity_deadline', 'exclusive_relayer',
+    'relayer', 'depositor', 'recipient', 'message', 'transaction_hash',
+    'block_number', 'log_index'
+)
+DEPOSIT_COLUMNS = (
+    'chain_id', 'block_number', 'transaction_hash', 'log_index', 'input_token', 'output_token',
+    'input_amount', 'output_amount', 'destination_chain_id', 'deposit_id', 'quote_timestamp',
+    'fill_deadline', 'exclusivity_deadline', 'depositor', 'recipient', 'exclusive_relayer', 'message'
+)
+BLOCK_COLUMNS = ('chain_id', 'block_number', 'block_timestamp', 'gas_used', 'gas_limit', 'base_fee_per_gas')
+TRANSACTION_COLUMNS = ('chain_id', 'transaction_hash', 'block_timestamp', 'gas_used', 'gas_price', 'total_gas_fee', 'event_type')
+
+FILL_BLOCK_INDEX = FILL_COLUMNS.index('block_number')
+DEPOSIT_BLOCK_INDEX = DEPOSIT_COLUMNS.index('block_number')
+BLOCK_NUMBER_INDEX = BLOCK_COLUMNS.index('block_number')
+
+BULK_MODE_EXECUTEMANY = 'executemany'
+BULK_MODE_LOAD_DATA = 'load_data'
+DEFAULT_BULK_BATCH_SIZE = 1000
+
+def fill_event_row(event, chain_id):
+    args = event['args']
+    return (
+        str(chain_id), 
+        args['inputToken'],
+        args['outputToken'],
+        str(args['inputAmount']),
+        str(args['outputAmount']),
+        str(args['repaymentChainId']),
+        str(args['originChainId']), 
+        str(args['depositId']),
+        datetime.fromtimestamp(args['fillDeadline']),
+        datetime.fromtimestamp(args['exclusivityDeadline']),
+        args['exclusiveRelayer'],
+        args['relayer'],
+        args['depositor'],
+        args['recipient'],
+        args['message'].hex(),
+        event['transactionHash'].hex(),
+        event['blockNumber'],
+        event['logIndex']
+    )
+
+def deposit_event_row(event, chain_id):
+    args = event['args']
+    return (
+        chain_id,
+        event['blockNumber'],
+        event['transactionHash'].hex(),
+        event['logIndex'],
+        args['inputToken'],
+        args['outputToken'],
+        str(args['inputAmount']),
+        str(args['outputAmount']),
+        args['destinationChainId'],
+        args['depositId'],
+        args['quoteTimestamp'],
+        args['fillDeadline'],
+        args['exclusivityDeadline'],
+        args['depositor'],
+        args['recipient'],
+        args['exclusiveRelayer'],
+        args['message'].hex()
+    )
+
+def to_infile_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
 
 class DatabaseOperations:
-    def __init__(self):
-        self.db_config = self.get_db_config()
+    unprocessed_transactions_query = """
+    SELECT t.transaction_hash, MIN(t.block_number) AS block_number
+    FROM {table} t
+    LEFT JOIN transaction_details td ON t.transaction_hash = td.transaction_hash AND td.chain_id = %s
+    WHERE td.transaction_hash IS NULL AND t.chain_id = %s AND t.block_number > %s
+    GROUP BY t.transaction_hash
+    ORDER BY block_number
+    """
+    unrelayed_deposit_ids_query = """
+    SELECT DISTINCT f.deposit_id
+    FROM filled_v3_relays f
+    LEFT JOIN relay_analysis ra ON f.deposit_id = ra.deposit_id
+    WHERE ra.deposit_id IS NULL
+    ORDER BY f.deposit_id
+    """
+    relay_analysis_insert_query = """
+    INSERT IGNORE INTO relay_analysis 
+    (destination_chain_id, origin_chain_id, input_token, output_token, 
+    input_amount, output_amount, deposit_id, relayer, depositor, 
+    recipient, gas_fee, earned_amount, priority_fee, input_amount_usd, output_amount_usd, earned_amount_usd)
+    SELECT 
+        d.destination_chain_id, f.origin_chain_id, 
+        f.input_token, f.output_token, f.input_amount, f.output_amount, 
+        f.deposit_id, f.relayer, f.depositor, d.recipient,
+        COALESCE(t.total_gas_fee, 0) AS gas_fee,
+        (f.input_amount - f.output_amount - COALESCE(t.total_gas_fee, 0)) AS earned_amount,
+        GREATEST(0, t.gas_price - b.base_fee_per_gas) * t.gas_used AS priority_fee,
+        f.input_amount * COALESCE(p1.price_usd, 1) AS input_amount_usd,
+        f.output_amount * COALESCE(p2.price_usd, 1) AS output_amount_usd,
+        (f.input_amount * COALESCE(p1.price_usd, 1) - f.output_amount * COALESCE(p2.price_usd, 1) - COALESCE(t.total_gas_fee, 0)) AS earned_amount_usd
+    FROM 
+        filled_v3_relays f
+    JOIN
+        v3_funds_deposited d ON f.deposit_id = d.deposit_id AND f.chain_id = d.destination_chain_id
+    JOIN
+        transaction_details t ON f.transaction_hash = t.transaction_hash AND f.chain_id = t.chain_id
+    JOIN
+        block_details b ON t.chain_id = b.chain_id AND b.block_number = f.block_number
+    JOIN
+        (SELECT token_address, price_usd FROM token_prices) p1 
+        ON f.input_token = p1.token_address
+    JOIN
+        (SELECT token_address, price_usd FROM token_prices) p2 
+        ON f.output_token = p2.token_address
+    WHERE f.deposit_id IN ({})
+    """
+    # Drops queue entries whose header was stored by another path (e.g. transaction_data_fetcher)
+    purge_pending_blocks_query = """
+    DELETE p FROM pending_blocks p
+    JOIN block_details b ON b.chain_id = p.chain_id AND b.block_number = p.block_number
+    WHERE p.chain_id = %s
+    """
+    pending_blocks_query = """
+    SELECT block_number
+    FROM pending_blocks
+    WHERE chain_id = %s
+    ORDER BY block_number
+    """
+    block_timestamps_query = """
+    SELECT block_number, block_timestamp
+    FROM block_details
+    WHERE chain_id = %s AND block_number IN ({})
+    """
+
+    def __init__(self, bulk_mode=BULK_MODE_EXECUTEMANY, bulk_batch_size=DEFAULT_BULK_BATCH_SIZE):
+        self.bulk_mode = bulk_mode
+        self.bulk_batch_size = bulk_batch_size
         self.conn = None
         self.cursor = None
 
-    def get_db_config(self):
-        try:
-            with open('database_config.json', 'r') as config_file:
-                config = json.load(config_file)
-                return config['database']
-        except FileNotFoundError:
-            print("Error: config.json file not found.")
-            return None
-        except json.JSONDecodeError:
-            print("Error: config.json is not a valid JSON file.")
-            return None
-        except KeyError:
-            print("Error: 'database' key not found in config.json.")
-            return None
-    
     def connect(self):
-        self.conn = mysql.connector.connect(**self.db_config)
+        if self.bulk_mode == BULK_MODE_LOAD_DATA:
+            self.conn = database.get_connection(database.POOL_LOAD_DATA)
+        else:
+            self.conn = database.get_connection()
+        self.cursor = self.conn.cursor()
+
+    def ensure_connected(self):
+        if self.conn.is_connected():
+            return
+        print("MySQL connection lost. Reconnecting...")
+        if not database.ensure_connected(self.conn):
+            raise mysql.connector.Error("Could not reconnect to MySQL")
         self.cursor = self.conn.cursor()
 
     def close(self):
         if self.cursor:
             self.cursor.close()
-        if self.conn and self.conn.is_connected():
+        if self.conn:
             self.conn.close()
-            print("MySQL connection is closed")
+            print("MySQL connection returned to pool")
 
-    
-    def insert_fill_events(self, events, chain_id):
-        insert_query = """
-        INSERT IGNORE INTO filled_v3_relays 
-        (chain_id, input_token, output_token, input_amount, output_amount, repayment_chain_id, 
-        origin_chain_id, deposit_id, fill_deadline, exclusivity_deadline, exclusive_relayer, 
-        relayer, depositor, recipient, message, transaction_hash, 
-        block_number, log_index)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
+    def _executemany_batch(self, table, columns, rows):
+        query = "INSERT IGNORE INTO {} ({}) VALUES ({})".format(table, ', '.join(columns), ', '.join(['%s'] * len(columns)))
+        with self.conn.cursor() as cursor:
+            cursor.executemany(query, rows)
+            return cursor.rowcount
+
+    def _load_data_batch(self, table, columns, rows):
+        query = """
+        LOAD DATA LOCAL INFILE %s
+        IGNORE INTO TABLE {}
+        CHARACTER SET utf8mb4
+        FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'
+        LINES TERMINATED BY '\\n'
+        ({})
+        """.format(table, ', '.join(columns))
+
+        with tempfile.NamedTemporaryFile('w', suffix='.tsv', encoding='utf-8', delete=False) as staging_file:
+            for row in rows:
+                staging_file.write('\t'.join(to_infile_value(value) for value in row) + '\n')
+
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute(query, (staging_file.name,))
+                return cursor.rowcount
+        finally:
+            os.remove(staging_file.name)
+
+    def bulk_insert(self, table, columns, rows, chain_id=None, stage=None, watermark=None, on_batch=None):
+        total_processed = len(rows)
         total_inserted = 0
-        total_processed = 0
-        batch_size = 100
+        batch_size = total_processed if self.bulk_mode == BULK_MODE_LOAD_DATA else self.bulk_batch_size
+        insert_batch = self._load_data_batch if self.bulk_mode == BULK_MODE_LOAD_DATA else self._executemany_batch
 
+        self.ensure_connected()
         try:
-            for index, event in enumerate(events, 1):
-                args = event['args']
-                fill_deadline = datetime.fromtimestamp(args['fillDeadline'])
-                exclusivity_deadline = datetime.fromtimestamp(args['exclusivityDeadline'])
-                
-                data = (
-                    str(chain_id), 
-                    args['inputToken'],
-                    args['outputToken'],
-                    str(args['inputAmount']),
-                    str(args['outputAmount']),
-                    str(args['repaymentChainId']),
-                    str(args['originChainId']), 
-                    str(args['depositId']),
-                    fill_deadline,
-                    exclusivity_deadline,
-                    args['exclusiveRelayer'],
-                    args['relayer'],
-                    args['depositor'],
-                    args['recipient'],
-                    args['message'].hex(),
-                    event['transactionHash'].hex(),
-                    event['blockNumber'],
-                    event['logIndex']
-                )
-                self.cursor.execute(insert_query, data)
-                total_processed += 1
-
-                if index % batch_size == 0:
+            for i in range(0, total_processed, max(batch_size, 1)):
+                batch = rows[i:i+batch_size]
+                total_inserted += insert_batch(table, columns, batch)
+                if on_batch is not None:
+                    on_batch(batch)
+                if i + batch_size < total_processed:
                     self.conn.commit()
-                    total_inserted += self.cursor.rowcount
-                    print(f"Processed {batch_size} rows. Newly inserted: {self.cursor.rowcount}. Total processed: {total_processed}")
 
-            
+            if watermark is not None:
+                self.advance_watermark(chain_id, stage, watermark, commit=False)
             self.conn.commit()
-            total_inserted += self.cursor.rowcount
-            print(f"Finished processing chain {chain_id}. Newly inserted: {self.cursor.rowcount}. Total processed: {total_processed}")
-
         except mysql.connector.Error as err:
-            print(f"MySQL Error: {err}")
+            print(f"MySQL Error inserting into {table}: {err}")
             self.conn.rollback()
             raise
 
+        if total_processed:
+            print(f"{table}: processed {total_processed} rows. Inserted: {total_inserted}. Duplicates: {total_processed - total_inserted}")
         return total_processed, total_inserted
+
+    def insert_fill_events(self, events, chain_id, watermark=None):
+        rows = [fill_event_row(event, chain_id) for event in events]
+        enqueue_blocks = lambda batch: self.enqueue_pending_blocks(chain_id, [row[FILL_BLOCK_INDEX] for row in batch])
+        return self.bulk_insert('filled_v3_relays', FILL_COLUMNS, rows, chain_id, STAGE_FILLS, watermark, enqueue_blocks)
     
-    def insert_deposit_events(self, events, chain_id, batch_size=100):
-        query = """
-        INSERT IGNORE INTO v3_funds_deposited 
-        (chain_id, block_number, transaction_hash, log_index, input_token, output_token, 
-        input_amount, output_amount, destination_chain_id, deposit_id, quote_timestamp, 
-        fill_deadline, exclusivity_deadline, depositor, recipient, exclusive_relayer, message)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
+    def insert_deposit_events(self, events, chain_id, watermark=None):
+        rows = [deposit_event_row(event, chain_id) for event in events]
+        enqueue_blocks = lambda batch: self.enqueue_pending_blocks(chain_id, [row[DEPOSIT_BLOCK_INDEX] for row in batch])
+        return self.bulk_insert('v3_funds_deposited', DEPOSIT_COLUMNS, rows, chain_id, STAGE_DEPOSITS, watermark, enqueue_blocks)
         
-        total_events = len(events)
-        total_inserted = 0
-        
-        for i in range(0, total_events, batch_size):
-            batch = events[i:i+batch_size]
-            values = [
-                (
-                    chain_id,
-                    event['blockNumber'],
-                    event['transactionHash'].hex(),
-                    event['logIndex'],
-                    event['args']['inputToken'],
-                    event['args']['outputToken'],
-                    str(event['args']['inputAmount']),
-                    str(event['args']['outputAmount']),
-                    event['args']['destinationChainId'],
-                    event['args']['depositId'],
-                    event['args']['quoteTimestamp'],
-                    event['args']['fillDeadline'],
-                    event['args']['exclusivityDeadline'],
-                    event['args']['depositor'],
-                    event['args']['recipient'],
-                    event['args']['exclusiveRelayer'],
-                    event['args']['message'].hex()
-                )
-                for event in batch
-            ]
-            
-            try:
-                with self.conn.cursor() as cursor:
-                    cursor.executemany(query, values)
-                self.conn.commit()
-                inserted = cursor.rowcount
-                total_inserted += inserted
-                print(f"Inserted {inserted} out of {len(batch)} events in this batch. Total inserted: {total_inserted}/{total_events}")
-            except Exception as e:
-                print(f"Error inserting batch of V3FundsDeposited events: {e}")
-                self.conn.rollback()
-        
-        return total_events, total_inserted
-        
-    def insert_transaction_details(self, chain_id, transaction_hash, block_timestamp, gas_used, gas_price, total_gas_fee, event_type):
-        query = """
-        INSERT IGNORE INTO transaction_details 
-        (chain_id, transaction_hash, block_timestamp, gas_used, gas_price, total_gas_fee, event_type)
-        VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """
-        data = (chain_id, transaction_hash, block_timestamp, gas_used, gas_price, total_gas_fee, event_type)
-        
-        try:
-            self.cursor.execute(query, data)
-            self.conn.commit()
-            return self.cursor.rowcount
-        except mysql.connector.Error as err:
-            print(f"Error inserting transaction details: {err}")
-            self.conn.rollback()
-            return 0
+    def insert_transaction_details(self, chain_id, transaction_hash, block_timestamp, gas_used, gas_price, total_gas_fee, event_type, watermark=None):
+        row = (chain_id, transaction_hash, block_timestamp, gas_used, gas_price, total_gas_fee, event_type)
+        _, inserted = self.insert_transaction_details_batch(chain_id, event_type, [row], watermark)
+        return inserted
+
+    def insert_transaction_details_batch(self, chain_id, event_type, rows, watermark=None):
+        stage = STAGE_FILL_TRANSACTIONS if event_type == 'fill' else STAGE_DEPOSIT_TRANSACTIONS
+        return self.bulk_insert('transaction_details', TRANSACTION_COLUMNS, rows, chain_id, stage, watermark)
 
     def get_unprocessed_transactions(self, table_name, chain_id):
         if table_name == 'filled_v3_relays':
-            query = """
-            SELECT DISTINCT t.transaction_hash
-            FROM filled_v3_relays t
-            LEFT JOIN transaction_details td ON t.transaction_hash = td.transaction_hash AND td.chain_id = %s
-            WHERE td.transaction_hash IS NULL AND t.chain_id = %s
-            """
+            stage = STAGE_FILL_TRANSACTIONS
         elif table_name == 'v3_funds_deposited':
-            query = """
-            SELECT DISTINCT t.transaction_hash
-            FROM v3_funds_deposited t
-            LEFT JOIN transaction_details td ON t.transaction_hash = td.transaction_hash AND td.chain_id = %s
-            WHERE td.transaction_hash IS NULL AND t.chain_id = %s
-            """
+            stage = STAGE_DEPOSIT_TRANSACTIONS
         else:
             raise ValueError(f"Unknown table name: {table_name}")
 
-        self.cursor.execute(query, (chain_id, chain_id))
-        return [row[0] for row in self.cursor.fetchall()]
+        self.ensure_connected()
+        watermark = self.get_watermark(chain_id, stage) or 0
+        self.cursor.execute(self.unprocessed_transactions_query.format(table=table_name), (chain_id, chain_id, watermark))
+        return self.cursor.fetchall()
     
     def fetch_and_insert_relay_data(self, batch_size=1000):
-        get_deposit_ids_query = """
-        SELECT DISTINCT f.deposit_id
-        FROM filled_v3_relays f
-        LEFT JOIN relay_analysis ra ON f.deposit_id = ra.deposit_id
-        WHERE ra.deposit_id IS NULL
-        ORDER BY f.deposit_id
-        """
-        
-        self.cursor.execute(get_deposit_ids_query)
+        self.cursor.execute(self.unrelayed_deposit_ids_query)
         all_deposit_ids = [row[0] for row in self.cursor.fetchall()]
         
         total_inserted = 0
@@ -200,39 +272,7 @@ class DatabaseOperations:
         for i in range(0, len(all_deposit_ids), batch_size):
             batch_deposit_ids = all_deposit_ids[i:i+batch_size]
             
-            insert_query = """
-            INSERT IGNORE INTO relay_analysis 
-            (destination_chain_id, origin_chain_id, input_token, output_token, 
-            input_amount, output_amount, deposit_id, relayer, depositor, 
-            recipient, gas_fee, earned_amount, priority_fee, input_amount_usd, output_amount_usd, earned_amount_usd)
-            SELECT 
-                d.destination_chain_id, f.origin_chain_id, 
-                f.input_token, f.output_token, f.input_amount, f.output_amount, 
-                f.deposit_id, f.relayer, f.depositor, d.recipient,
-                COALESCE(t.total_gas_fee, 0) AS gas_fee,
-                (f.input_amount - f.output_amount - COALESCE(t.total_gas_fee, 0)) AS earned_amount,
-                GREATEST(0, t.gas_price - b.base_fee_per_gas) * t.gas_used AS priority_fee,
-                f.input_amount * COALESCE(p1.price_usd, 1) AS input_amount_usd,
-                f.output_amount * COALESCE(p2.price_usd, 1) AS output_amount_usd,
-                (f.input_amount * COALESCE(p1.price_usd, 1) - f.output_amount * COALESCE(p2.price_usd, 1) - COALESCE(t.total_gas_fee, 0)) AS earned_amount_usd
-            FROM 
-                filled_v3_relays f
-            JOIN
-                v3_funds_deposited d ON f.deposit_id = d.deposit_id AND f.chain_id = d.destination_chain_id
-            JOIN
-                transaction_details t ON f.transaction_hash = t.transaction_hash AND f.chain_id = t.chain_id
-            JOIN
-                block_details b ON t.chain_id = b.chain_id AND b.block_number = f.block_number
-            JOIN
-                (SELECT token_address, price_usd FROM token_prices) p1 
-                ON f.input_token = p1.token_address
-            JOIN
-                (SELECT token_address, price_usd FROM token_prices) p2 
-                ON f.output_token = p2.token_address
-            WHERE f.deposit_id IN ({})
-            """
-            
-            formatted_query = insert_query.format(','.join(['%s'] * len(batch_deposit_ids)))
+            formatted_query = self.relay_analysis_insert_query.format(','.join(['%s'] * len(batch_deposit_ids)))
             
             try:
                 print(f"Processing batch {i//batch_size + 1}, deposit_ids {batch_deposit_ids[0]} to {batch_deposit_ids[-1]}")
@@ -247,33 +287,46 @@ class DatabaseOperations:
         
         print(f"Finished processing. Total rows inserted: {total_inserted}")
         return total_inserted
-    def get_unique_blocks(self):
+    def enqueue_pending_blocks(self, chain_id, block_numbers):
         query = """
-        SELECT DISTINCT chain_id, block_number FROM (
-            SELECT chain_id, block_number FROM filled_v3_relays
-            UNION
-            SELECT chain_id, block_number FROM v3_funds_deposited
-        ) as combined
-        WHERE (chain_id, block_number) NOT IN (
-            SELECT chain_id, block_number FROM block_details
-        )
+        INSERT IGNORE INTO pending_blocks (chain_id, block_number)
+        VALUES (%s, %s)
         """
-        self.cursor.execute(query)
-        return self.cursor.fetchall()
+        rows = [(chain_id, block_number) for block_number in sorted(set(block_numbers))]
+        if rows:
+            with self.conn.cursor() as cursor:
+                cursor.executemany(query, rows)
+
+    def dequeue_pending_blocks(self, chain_id, block_numbers):
+        query = """
+        DELETE FROM pending_blocks
+        WHERE chain_id = %s AND block_number IN ({})
+        """
+        block_numbers = sorted(set(block_numbers))
+        if block_numbers:
+            with self.conn.cursor() as cursor:
+                cursor.execute(query.format(','.join(['%s'] * len(block_numbers))), [chain_id] + block_numbers)
+
+    def get_pending_blocks(self, chain_id):
+        self.ensure_connected()
+        self.cursor.execute(self.purge_pending_blocks_query, (chain_id,))
+        self.conn.commit()
+        self.cursor.execute(self.pending_blocks_query, (chain_id,))
+        return [row[0] for row in self.cursor.fetchall()]
     
     def insert_block_details(self, chain_id, block_details):
-        insert_query = """
-        INSERT IGNORE INTO block_details 
-        (chain_id, block_number, block_timestamp, gas_used, gas_limit, base_fee_per_gas)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        """
-        try:
-            self.cursor.executemany(insert_query, block_details)
-            self.conn.commit()
-            print(f"Inserted {self.cursor.rowcount} block details for chain {chain_id}")
-        except Exception as e:
-            print(f"Error inserting block details for chain {chain_id}: {e}")
-            self.conn.rollback()
+        dequeue_blocks = lambda batch: self.dequeue_pending_blocks(chain_id, [row[BLOCK_NUMBER_INDEX] for row in batch])
+        return self.bulk_insert('block_details', BLOCK_COLUMNS, block_details, chain_id, on_batch=dequeue_blocks)
+
+    def get_block_timestamps(self, chain_id, block_numbers, batch_size=1000):
+        block_numbers = list(block_numbers)
+        timestamps = {}
+        self.ensure_connected()
+        for i in range(0, len(block_numbers), batch_size):
+            batch = block_numbers[i:i+batch_size]
+            self.cursor.execute(self.block_timestamps_query.format(','.join(['%s'] * len(batch))), [chain_id] + batch)
+            timestamps.update(self.cursor.fetchall())
+        return timestamps
 
     def get_last_synced_block(self, chain_id):
         query = """
@@ -292,6 +345,34 @@ class DatabaseOperations:
             print(f"Error fetching last synced block for chain {chain_id}: {err}")
             return None
         
+    def get_watermark(self, chain_id, stage):
+        query = """
+        SELECT watermark
+        FROM sync_watermarks
+        WHERE chain_id = %s AND stage = %s
+        """
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute(query, (chain_id, stage))
+                result = cursor.fetchone()
+            return result[0] if result else None
+        except mysql.connector.Error as err:
+            print(f"Error fetching {stage} watermark for chain {chain_id}: {err}")
+            return None
+
+    def advance_watermark(self, chain_id, stage, watermark, commit=True):
+        query = """
+        INSERT INTO sync_watermarks (chain_id, stage, watermark)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            watermark = GREATEST(watermark, VALUES(watermark)),
+            updated_at = CURRENT_TIMESTAMP
+        """
+        with self.conn.cursor() as cursor:
+            cursor.execute(query, (chain_id, stage, watermark))
+        if commit:
+            self.conn.commit()
+
     def update_chain_sync_status(self):
         query = """
         INSERT INTO chain_sync_status (chain_id, last_synced_block)
@@ -301,9 +382,11 @@ class DatabaseOperations:
         FROM (
             SELECT 
                 chain_id,
-                MAX(block_number) as last_synced_block
+                MIN(watermark) as last_synced_block
             FROM 
-                filled_v3_relays
+                sync_watermarks
+            WHERE 
+                stage IN (%s, %s)
             GROUP BY 
                 chain_id
         ) AS subquery
@@ -314,11 +397,40 @@ class DatabaseOperations:
 
         try:
             with self.conn.cursor() as cursor:
-                cursor.execute(query)
+                cursor.execute(query, (STAGE_FILLS, STAGE_DEPOSITS))
             self.conn.commit()
             print("Chain sync status updated successfully.")
             return cursor.rowcount
         except Exception as e:
             print(f"Error updating chain sync status: {e}")
             self.conn.rollback()
-            return 0
\ No newline at end of file
+            return 0
+
+    def get_block_window_size(self, chain_id):
+        query = """
+        SELECT window_size
+        FROM chain_block_window
+        WHERE chain_id = %s
+        """
+        try:
+            self.cursor.execute(query, (chain_id,))
+            result = self.cursor.fetchone()
+            return result[0] if result else None
+        except mysql.connector.Error as err:
+            print(f"Error fetching block window size for chain {chain_id}: {err}")
+            return None
+
+    def update_block_window_size(self, chain_id, window_size):
+        query = """
+        INSERT INTO chain_block_window (chain_id, window_size)
+        VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE
+            window_size = VALUES(window_size),
+            updated_at = CURRENT_TIMESTAMP
+        """
+        try:
+            self.cursor.execute(query, (chain_id, window_size))
+            self.conn.commit()
+        except mysql.connector.Error as err:
+            print(f"Error saving block window size for chain {chain_id}: {err}")
+            self.conn.rollback()
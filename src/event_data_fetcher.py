@@ -1,10 +1,33 @@
 import json
+import queue
+import threading
 from web3 import Web3
+from eth_utils import event_abi_to_log_topic
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from db_operations import DatabaseOperations
+import database
+from db_operations import DatabaseOperations, STAGE_FILLS, STAGE_DEPOSITS, BULK_MODE_EXECUTEMANY, BULK_MODE_LOAD_DATA, DEFAULT_BULK_BATCH_SIZE
+from rpc_client import batch_call, to_int
 from web3.middleware import geth_poa_middleware
 
+DEFAULT_WINDOW_SIZE = 1000
+MIN_WINDOW_SIZE = 10
+MAX_WINDOW_SIZE = 100000
+TARGET_EVENTS_PER_WINDOW = 2000
+SLOW_WINDOW_SECONDS = 10
+RETRY_BACKOFF_SECONDS = 1
+EVENT_QUEUE_SIZE = 8
+BLOCK_BATCH_RETRIES = 3
+RATE_LIMIT_RETRIES = 5
+# Provider messages for a window that spans too many blocks or returns too many logs
+RANGE_ERROR_HINTS = (
+    'block range', 'range too large', 'range is too large', 'exceed maximum block range',
+    'query returned more than', 'too many results', 'response size', 'timeout', 'timed out'
+)
+# Throttling is retried at the same window size after a backoff
+RATE_LIMIT_HINTS = ('rate limit', 'rate-limit', 'too many requests', '429')
 
 def load_config(filename):
     with open(filename, 'r') as f:
@@ -30,7 +53,11 @@ def get_block_range(chain_id, w3, db_ops):
     latest_block = w3.eth.get_block('latest', full_transactions=False)
     latest_block_number = latest_block['number']
 
-    start_block = db_ops.get_last_synced_block(chain_id)
+    watermarks = [db_ops.get_watermark(chain_id, stage) for stage in (STAGE_FILLS, STAGE_DEPOSITS)]
+    if None not in watermarks:
+        start_block = min(watermarks) + 1
+    else:
+        start_block = db_ops.get_last_synced_block(chain_id)
 
     if start_block is None:
         print(f"No last synced block found for chain {chain_id}. Starting from the latest block.")
@@ -46,92 +73,334 @@ def setup_web3_and_contract(chain_config, contract_address, contract_abi):
     return w3, contract
 
 def fetch_events_batch(contract, from_block, to_block):
-    filled_events = contract.events.FilledV3Relay.get_logs(fromBlock=from_block, toBlock=to_block)
-    deposited_events = contract.events.V3FundsDeposited.get_logs(fromBlock=from_block, toBlock=to_block)
+    filled_event = contract.events.FilledV3Relay()
+    deposited_event = contract.events.V3FundsDeposited()
+    filled_topic = event_abi_to_log_topic(filled_event.abi)
+    deposited_topic = event_abi_to_log_topic(deposited_event.abi)
+
+    logs = contract.w3.eth.get_logs({
+        'address': contract.address,
+        'fromBlock': from_block,
+        'toBlock': to_block,
+        'topics': [[Web3.to_hex(filled_topic), Web3.to_hex(deposited_topic)]]
+    })
+
+    filled_events = []
+    deposited_events = []
+    for log in logs:
+        if log['topics'][0] == filled_topic:
+            filled_events.append(filled_event.process_log(log))
+        elif log['topics'][0] == deposited_topic:
+            deposited_events.append(deposited_event.process_log(log))
     return filled_events, deposited_events
 
+def fetch_events_window(contract, from_block, to_block):
+    window_start_time = time.time()
+    batch_filled, batch_deposited = fetch_events_batch(contract, from_block, to_block)
+    return batch_filled, batch_deposited, time.time() - window_start_time
+
+def is_rate_limit_error(error):
+    message = str(error).lower()
+    return any(hint in message for hint in RATE_LIMIT_HINTS)
+
+def is_range_error(error):
+    message = str(error).lower()
+    return not is_rate_limit_error(error) and any(hint in message for hint in RANGE_ERROR_HINTS)
+
+def next_window_size(window_size, events_count, duration):
+    if events_count > TARGET_EVENTS_PER_WINDOW or duration > SLOW_WINDOW_SECONDS:
+        return max(MIN_WINDOW_SIZE, window_size // 2)
+    if events_count < TARGET_EVENTS_PER_WINDOW // 4:
+        return min(MAX_WINDOW_SIZE, window_size * 2)
+    return window_size
+
+def fetch_events_with_retry(chain_id, contract, from_block, to_block, window_size):
+    filled_events = []
+    deposited_events = []
+    block = from_block
+    rate_limited = 0
+
+    while block <= to_block:
+        window_end = min(block + window_size - 1, to_block)
+        try:
+            batch_filled, batch_deposited, _ = fetch_events_window(contract, block, window_end)
+        except Exception as e:
+            if is_rate_limit_error(e) and rate_limited < RATE_LIMIT_RETRIES:
+                rate_limited += 1
+                print(f"Chain {chain_id}: rate limited on blocks {block}-{window_end} ({e}). Retrying in {RETRY_BACKOFF_SECONDS * rate_limited} seconds.")
+                time.sleep(RETRY_BACKOFF_SECONDS * rate_limited)
+                continue
+            if not is_range_error(e) or window_size <= MIN_WINDOW_SIZE:
+                raise
+            window_size = max(MIN_WINDOW_SIZE, window_size // 2)
+            print(f"Chain {chain_id}: blocks {block}-{window_end} rejected ({e}). Retrying with window of {window_size} blocks.")
+            time.sleep(RETRY_BACKOFF_SECONDS)
+            continue
+
+        rate_limited = 0
+        filled_events.extend(batch_filled)
+        deposited_events.extend(batch_deposited)
+        block = window_end + 1
+
+    return filled_events, deposited_events, window_size
+
 def print_progress(chain_id, events_count, progress, total_duration, estimated_time_left):
     print(f"Chain {chain_id}: Processed {events_count} events. Progress: {progress:.2f}%")
     print(f"Total duration: {total_duration:.2f} seconds")
     print(f"Estimated time left: {timedelta(seconds=int(estimated_time_left))}")
 
-def fetch_events_details(chain_config, contract_abi, db_ops):
-    print(f"Start fetching.")
-    w3, contract = setup_web3_and_contract(chain_config, chain_config['contract_address'], contract_abi)
+def put_batch(batch_queue, item, stop_event):
+    while not stop_event.is_set():
+        try:
+            batch_queue.put(item, timeout=1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def fetch_events_details(chain_id, contract, start_block, end_block, window_size, batch_queue, stop_event, max_concurrency=1):
+    print(f"Chain {chain_id}: fetching events from block {start_block} to {end_block}, starting with a window of {window_size} blocks")
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        in_flight = deque()
+        next_block = start_block
+
+        while in_flight or next_block <= end_block:
+            while next_block <= end_block and len(in_flight) < max_concurrency:
+                window_end = min(next_block + window_size - 1, end_block)
+                in_flight.append((next_block, window_end, executor.submit(fetch_events_window, contract, next_block, window_end)))
+                next_block = window_end + 1
+
+            from_block, to_block, future = in_flight.popleft()
+            try:
+                batch_filled, batch_deposited, duration = future.result()
+                window_size = next_window_size(window_size, len(batch_filled) + len(batch_deposited), duration)
+            except Exception as e:
+                if is_rate_limit_error(e):
+                    print(f"Chain {chain_id}: rate limited on blocks {from_block}-{to_block} ({e}). Retrying at the same window size.")
+                    time.sleep(RETRY_BACKOFF_SECONDS)
+                    batch_filled, batch_deposited, _ = fetch_events_with_retry(chain_id, contract, from_block, to_block, to_block - from_block + 1)
+                else:
+                    if not is_range_error(e) or to_block == from_block:
+                        raise
+                    window_size = max(MIN_WINDOW_SIZE, (to_block - from_block + 1) // 2)
+                    print(f"Chain {chain_id}: blocks {from_block}-{to_block} rejected ({e}). Retrying with window of {window_size} blocks.")
+                    time.sleep(RETRY_BACKOFF_SECONDS)
+                    batch_filled, batch_deposited, window_size = fetch_events_with_retry(chain_id, contract, from_block, to_block, window_size)
+
+            if not put_batch(batch_queue, (from_block, to_block, batch_filled, batch_deposited), stop_event):
+                for _, _, pending in in_flight:
+                    pending.cancel()
+                break
+
+    return window_size
+
+def run_event_producer(producer_state, chain_id, contract, start_block, end_block, window_size, batch_queue, stop_event, max_concurrency):
+    try:
+        producer_state['window_size'] = fetch_events_details(
+            chain_id, contract, start_block, end_block, window_size, batch_queue, stop_event, max_concurrency
+        )
+    except Exception as e:
+        producer_state['error'] = e
+    finally:
+        put_batch(batch_queue, None, stop_event)
+
+def parse_block(chain_id, block):
+    return (
+        chain_id,
+        to_int(block['number']),
+        datetime.fromtimestamp(to_int(block['timestamp'])),
+        to_int(block['gasUsed']),
+        to_int(block['gasLimit']),
+        to_int(block.get('baseFeePerGas'))
+    )
+
+def fetch_block_batch(rpc_endpoint, chain_id, block_numbers):
+    details = {}
+    pending = list(block_numbers)
+
+    for attempt in range(1, BLOCK_BATCH_RETRIES + 1):
+        try:
+            responses = batch_call(rpc_endpoint, [('eth_getBlockByNumber', [hex(block_number), False]) for block_number in pending])
+        except Exception as e:
+            print(f"Error fetching block batch {pending[0]}-{pending[-1]} for chain {chain_id} (attempt {attempt}): {e}")
+            time.sleep(RETRY_BACKOFF_SECONDS * attempt)
+            continue
+
+        failed = []
+        for block_number, (block, error) in zip(pending, responses):
+            if error is not None:
+                failed.append(block_number)
+            else:
+                details[block_number] = parse_block(chain_id, block)
+
+        pending = failed
+        if not pending:
+            break
+
+        print(f"Retrying {len(pending)} blocks for chain {chain_id} (attempt {attempt}): {pending[:5]}")
+        time.sleep(RETRY_BACKOFF_SECONDS * attempt)
+
+    for block_number in pending:
+        print(f"Error fetching block {block_number} for chain {chain_id}: giving up after {BLOCK_BATCH_RETRIES} attempts")
+
+    return [details.get(block_number) for block_number in block_numbers]
+
+def fetch_block_details(rpc_endpoint, chain_id, block_numbers, db_ops, batch_size=100, max_concurrency=1):
+    total_blocks = len(block_numbers)
+    processed_blocks = 0
 
-    start_block, end_block = get_block_range(chain_config['chainid'], w3, db_ops)
-    if start_block is None or end_block is None:
-        print(f"No valid block range found for chain {chain_config['chainid']}")
-        return [], []
+    batches = [block_numbers[i:i+batch_size] for i in range(0, total_blocks, batch_size)]
 
-    print(f"Fetching events for chain {chain_config['chainid']} from block {start_block} to {end_block}")
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        all_results = executor.map(lambda batch: fetch_block_batch(rpc_endpoint, chain_id, batch), batches)
 
-    filled_events = []
-    deposited_events = []
-    batch_size = 1000
+        for batch, results in zip(batches, all_results):
+            # Blocks that failed stay in pending_blocks and are retried on the next run
+            block_details = [details for details in results if details is not None]
+            db_ops.insert_block_details(chain_id, block_details)
+
+            processed_blocks += len(batch)
+            print(f"Processed {processed_blocks}/{total_blocks} blocks for chain {chain_id}")
+
+    print(f"Finished processing all blocks for chain {chain_id}")
+
+def write_event_batches(chain_id, db_ops, batch_queue, start_block, end_block):
+    total_processed = 0
+    total_inserted = 0
     total_blocks = end_block - start_block + 1
-    fetch_start_time = time.time()
+    write_start_time = time.time()
 
-    for i in range(start_block, end_block + 1, batch_size):
-        from_block = i
-        to_block = min(i + batch_size - 1, end_block)
-        
-        batch_filled, batch_deposited = fetch_events_batch(contract, from_block, to_block)
-        filled_events.extend(batch_filled)
-        deposited_events.extend(batch_deposited)
-        
-        total_duration = time.time() - fetch_start_time
+    while True:
+        batch = batch_queue.get()
+        if batch is None:
+            break
+
+        from_block, to_block, batch_filled, batch_deposited = batch
+        for insert_events, events in ((db_ops.insert_fill_events, batch_filled), (db_ops.insert_deposit_events, batch_deposited)):
+            processed, inserted = insert_events(events, chain_id, watermark=to_block)
+            total_processed += processed
+            total_inserted += inserted
+
+        total_duration = time.time() - write_start_time
         progress = (to_block - start_block + 1) / total_blocks * 100
         estimated_time_left = (total_duration / progress) * (100 - progress) if progress > 0 else 0
-        
-        print_progress(chain_config['chainid'], len(filled_events) + len(deposited_events), progress, total_duration, estimated_time_left)
-        
-        time.sleep(0.1)
 
-    total_fetch_time = time.time() - fetch_start_time
-    print(f"Total fetch time for chain {chain_config['chainid']}: {total_fetch_time:.2f} seconds")
-    print(f"Average time per block: {total_fetch_time / total_blocks:.4f} seconds")
-    print(f"Total FilledV3Relay events fetched: {len(filled_events)}")
-    print(f"Total V3FundsDeposited events fetched: {len(deposited_events)}")
+        print_progress(chain_id, total_processed, progress, total_duration, estimated_time_left)
 
-    return filled_events, deposited_events
+    total_write_time = time.time() - write_start_time
+    print(f"Total sync time for chain {chain_id}: {total_write_time:.2f} seconds")
+    print(f"Average time per block: {total_write_time / total_blocks:.4f} seconds")
 
-def fetch_block_details(w3, chain_id, block_numbers, db_ops, batch_size=100):
-    total_blocks = len(block_numbers)
-    processed_blocks = 0
+    return total_processed, total_inserted
+
+def sync_chain_events(chain_config, contract_abi, db_ops, max_concurrency=1):
+    chain_id = chain_config['chainid']
+    w3, contract = setup_web3_and_contract(chain_config, chain_config['contract_address'], contract_abi)
+
+    start_block, end_block = get_block_range(chain_id, w3, db_ops)
+    if start_block is None or end_block is None:
+        print(f"No valid block range found for chain {chain_id}")
+        return 0, 0
+
+    window_size = db_ops.get_block_window_size(chain_id) or DEFAULT_WINDOW_SIZE
+    batch_queue = queue.Queue(maxsize=EVENT_QUEUE_SIZE)
+    stop_event = threading.Event()
+    producer_state = {'window_size': window_size, 'error': None}
+
+    producer = threading.Thread(
+        target=run_event_producer,
+        args=(producer_state, chain_id, contract, start_block, end_block, window_size, batch_queue, stop_event, max_concurrency),
+        daemon=True
+    )
+    producer.start()
+
+    try:
+        processed, inserted = write_event_batches(chain_id, db_ops, batch_queue, start_block, end_block)
+    finally:
+        stop_event.set()
+        producer.join()
+
+    db_ops.update_block_window_size(chain_id, producer_state['window_size'])
+
+    if producer_state['error'] is not None:
+        raise producer_state['error']
+
+    return processed, inserted
+
+def sync_chain_blocks(chain_config, contract_abi, db_ops, max_concurrency=1):
+    chain_id = chain_config['chainid']
+    block_numbers = db_ops.get_pending_blocks(chain_id)
+    if block_numbers:
+        fetch_block_details(chain_config['rpc_endpoint'], chain_id, block_numbers, db_ops, batch_size=100, max_concurrency=max_concurrency)
 
-    for i in range(0, total_blocks, batch_size):
-        batch = block_numbers[i:i+batch_size]
-        block_details = []
-        for block_number in batch:
+def sync_chain(chain_config, contract_abi, fetch_events, fetch_blocks, max_concurrency, bulk_mode=BULK_MODE_EXECUTEMANY, bulk_batch_size=DEFAULT_BULK_BATCH_SIZE):
+    db_ops = DatabaseOperations(bulk_mode, bulk_batch_size)
+    processed, inserted = 0, 0
+
+    try:
+        db_ops.connect()
+
+        if fetch_events:
+            processed, inserted = sync_chain_events(chain_config, contract_abi, db_ops, max_concurrency)
+
+        if fetch_blocks:
+            sync_chain_blocks(chain_config, contract_abi, db_ops, max_concurrency)
+
+    finally:
+        db_ops.close()
+
+    return processed, inserted
+
+def run_concurrent(config, contract_abi, fetch_events, fetch_blocks, max_workers=None, chain_concurrency=4, bulk_mode=BULK_MODE_EXECUTEMANY, bulk_batch_size=DEFAULT_BULK_BATCH_SIZE):
+    total_inserted = 0
+    total_processed = 0
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(config)) as executor:
+        futures = {
+            executor.submit(
+                sync_chain,
+                chain_config,
+                contract_abi,
+                fetch_events,
+                fetch_blocks,
+                chain_config.get('max_concurrency', chain_concurrency),
+                bulk_mode,
+                bulk_batch_size
+            ): chain_config['chainid']
+            for chain_config in config
+        }
+
+        for future in as_completed(futures):
+            chain_id = futures[future]
             try:
-                block = w3.eth.get_block(block_number)
-                block_details.append((
-                    chain_id,
-                    block_number,
-                    datetime.fromtimestamp(block['timestamp']),
-                    block['gasUsed'],
-                    block['gasLimit'],
-                    block.get('baseFeePerGas', 0) 
-                ))
+                processed, inserted = future.result()
+                total_processed += processed
+                total_inserted += inserted
+                print(f"Chain {chain_id} completed. Rows processed: {processed}. New rows inserted: {inserted}")
             except Exception as e:
-                print(f"Error fetching block {block_number} for chain {chain_id}: {e}")
-        
-        db_ops.insert_block_details(chain_id, block_details)
-        
-        processed_blocks += len(batch)
-        print(f"Processed {processed_blocks}/{total_blocks} blocks for chain {chain_id}")
+                print(f"An error occurred while syncing chain {chain_id}: {e}")
 
-    print(f"Finished processing all blocks for chain {chain_id}")
+    print(f"Concurrent sync completed. Total rows processed: {total_processed}. Total new rows inserted: {total_inserted}")
 
-def main(fetch_events=True, fetch_blocks=True):
+def main(fetch_events=True, fetch_blocks=True, concurrent=False, max_workers=None, chain_concurrency=4, bulk_mode=BULK_MODE_EXECUTEMANY, bulk_batch_size=DEFAULT_BULK_BATCH_SIZE, pool_size=None):
     config = load_config('config.json')
     contract_abi = load_abi('abi.json')
 
+    if concurrent and pool_size is None:
+        # Every chain worker holds its own pooled connection for the whole sync
+        pool_size = max(database.DEFAULT_POOL_SIZE, max_workers or len(config))
+    database.configure(pool_size)
+
+    if concurrent:
+        run_concurrent(config, contract_abi, fetch_events, fetch_blocks, max_workers, chain_concurrency, bulk_mode, bulk_batch_size)
+        print("Script execution completed.")
+        return
+
     end_time = int(time.time())
     start_time = end_time - 24 * 60 * 60 * 2
 
-    db_ops = DatabaseOperations()
+    db_ops = DatabaseOperations(bulk_mode, bulk_batch_size)
 
     try:
         db_ops.connect()
@@ -142,16 +411,9 @@ def main(fetch_events=True, fetch_blocks=True):
         if fetch_events:
             print(f"Event fetching started.")
             for chain_config in config:
-                filled_events, deposited_events = fetch_events_details(chain_config, contract_abi, db_ops)
-                
-                print(f"Processing {len(filled_events)} FilledV3Relay events for chain {chain_config['chainid']}")
-                processed_filled, inserted_filled = db_ops.insert_fill_events(filled_events, chain_config['chainid'])
-                
-                print(f"Processing {len(deposited_events)} V3FundsDeposited events for chain {chain_config['chainid']}")
-                processed_deposited, inserted_deposited = db_ops.insert_deposit_events(deposited_events, chain_config['chainid'])
-                
-                total_processed += processed_filled + processed_deposited
-                total_inserted += inserted_filled + inserted_deposited
+                processed, inserted = sync_chain_events(chain_config, contract_abi, db_ops, chain_config.get('max_concurrency', chain_concurrency))
+                total_processed += processed
+                total_inserted += inserted
 
                 print(f"Total rows inserted so far: {total_inserted}")
 
@@ -159,19 +421,8 @@ def main(fetch_events=True, fetch_blocks=True):
 
         if fetch_blocks:
             print("Block fetching started.")
-            unique_blocks = db_ops.get_unique_blocks()
-            
-            blocks_by_chain = {}
-            for chain_id, block_number in unique_blocks:
-                if chain_id not in blocks_by_chain:
-                    blocks_by_chain[chain_id] = []
-                blocks_by_chain[chain_id].append(block_number)
-
             for chain_config in config:
-                chain_id = chain_config['chainid']
-                if chain_id in blocks_by_chain:
-                    w3, _ = setup_web3_and_contract(chain_config, chain_config['contract_address'], contract_abi)
-                    fetch_block_details(w3, chain_id, blocks_by_chain[chain_id], db_ops, batch_size=100)
+                sync_chain_blocks(chain_config, contract_abi, db_ops, chain_config.get('max_concurrency', chain_concurrency))
 
             print("Block fetching completed.")
 
@@ -189,10 +440,25 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Fetch events and block details for Across protocol")
     parser.add_argument('--events', action='store_true', help='Fetch events')
     parser.add_argument('--blocks', action='store_true', help='Fetch block details')
+    parser.add_argument('--concurrent', action='store_true', help='Sync all chains at the same time')
+    parser.add_argument('--max-workers', type=int, default=None, help='Number of chains synced at the same time (default: all)')
+    parser.add_argument('--chain-concurrency', type=int, default=4, help='Max in-flight RPC requests per chain (overridden by max_concurrency in config.json)')
+    parser.add_argument('--bulk-mode', choices=[BULK_MODE_EXECUTEMANY, BULK_MODE_LOAD_DATA], default=BULK_MODE_EXECUTEMANY, help='Write path for raw tables (load_data stages rows through LOAD DATA LOCAL INFILE)')
+    parser.add_argument('--bulk-batch-size', type=int, default=DEFAULT_BULK_BATCH_SIZE, help='Rows per multi-row INSERT in executemany mode')
+    parser.add_argument('--pool-size', type=int, default=None, help='MySQL connection pool size (default: pool_size in database_config.json)')
     args = parser.parse_args()
 
     if not args.events and not args.blocks:
         args.events = True
         args.blocks = True
 
-    main(fetch_events=args.events, fetch_blocks=args.blocks)
\ No newline at end of file
+    main(
+        fetch_events=args.events,
+        fetch_blocks=args.blocks,
+        concurrent=args.concurrent,
+        max_workers=args.max_workers,
+        chain_concurrency=args.chain_concurrency,
+        bulk_mode=args.bulk_mode,
+        bulk_batch_size=args.bulk_batch_size,
+        pool_size=args.pool_size
+    )
\ No newline at end of file
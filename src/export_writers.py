@@ -0,0 +1,52 @@
+import csv
+from decimal import Decimal
+from mysql.connector import FieldType
+from frame_loader import column_kinds
+
+DATE_TYPES = {FieldType.DATE, FieldType.NEWDATE}
+
+# Writers take (cursor.description, rows) chunks as produced by an unbuffered cursor
+
+def write_csv_chunks(chunks, filename):
+    total = 0
+    with open(filename, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        for description, rows in chunks:
+            if total == 0:
+                writer.writerow([col[0] for col in description])
+            writer.writerows(rows)
+            total += len(rows)
+    return total
+
+def arrow_schema(description):
+    import pyarrow as pa
+
+    # Types come from the result metadata, not the values, so a column that is
+    # all NULL in the first chunk still gets its real type.
+    # DECIMAL precision varies per query, so Parquet gets float64 columns
+    arrow_types = {'float': pa.float64(), 'int': pa.int64(), 'datetime': pa.timestamp('us'), 'object': pa.string()}
+    fields = []
+    for (name, type_code, *_), kind in zip(description, column_kinds(description, False, set())):
+        fields.append(pa.field(name, pa.date32() if type_code in DATE_TYPES else arrow_types[kind]))
+    return pa.schema(fields)
+
+def write_parquet_chunks(chunks, filename):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    total = 0
+    writer = None
+    try:
+        for description, rows in chunks:
+            if writer is None:
+                writer = pq.ParquetWriter(filename, arrow_schema(description))
+            arrays = []
+            for i, field in enumerate(writer.schema):
+                values = [float(row[i]) if isinstance(row[i], Decimal) else row[i] for row in rows]
+                arrays.append(pa.array(values, type=field.type))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=writer.schema))
+            total += len(rows)
+    finally:
+        if writer is not None:
+            writer.close()
+    return total
@@ -1,21 +1,67 @@
 import requests
 from datetime import datetime
-import mysql.connector
 from mysql.connector import Error
 import logging
 import time
-import json
+import database
 
 logging.basicConfig(filename='fee_data_fetch_hourly.log', level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
 
-with open("database_config.json") as f:
-    db_config = json.load(f)
-
-
 API_URL = "https://app.across.to/api/suggested-fees"
 
+TOKEN_PAIRS_QUERY = """
+    WITH normalized_amounts AS (
+    SELECT 
+        r.*,
+        r.output_amount * POW(10, tr.decimals) AS original_output_amount
+    FROM relay_analysis_results r
+    JOIN token_registry tr ON tr.chain_id = r.destination_chain_id AND tr.token_address = r.output_token
+    ),
+    ranges AS (
+    SELECT 
+        destination_chain_id,
+        origin_chain_id,
+        output_token,
+        input_token,
+        CASE 
+            WHEN output_amount_usd < 1000 THEN '0-1k'
+            WHEN output_amount_usd < 10000 THEN '1k-10k'
+            WHEN output_amount_usd < 100000 THEN '10k-100k'
+            ELSE '100k+'
+        END AS amount_range,
+        POWER(10, FLOOR(LOG10(original_output_amount))) AS output_amount_range
+    FROM normalized_amounts
+    )
+    SELECT 
+        destination_chain_id,
+        origin_chain_id,
+        output_token,
+        input_token,
+        POWER(10, FLOOR(LOG10(AVG(output_amount_range)))) as output_amount         
+    FROM ranges
+    GROUP BY 
+        destination_chain_id,
+        origin_chain_id,
+        output_token,
+        input_token,
+        amount_range
+    ORDER BY 
+        destination_chain_id,
+        origin_chain_id,
+        output_token,
+        input_token,
+        amount_range
+"""
+UNKNOWN_DECIMALS_QUERY = """
+    SELECT r.destination_chain_id, r.output_token, COUNT(*)
+    FROM relay_analysis_results r
+    LEFT JOIN token_registry tr ON tr.chain_id = r.destination_chain_id AND tr.token_address = r.output_token
+    WHERE tr.token_address IS NULL
+    GROUP BY r.destination_chain_id, r.output_token
+"""
+
 def convert_datetime_to_timestamp(dt_str):
     dt = datetime.strptime(dt_str, '%Y-%m-%d %H:%M:%S')
     return int(time.mktime(dt.timetuple()))
@@ -57,59 +103,19 @@ def insert_fee_data(cursor, data, timestamp, params):
     cursor.execute(sql, values)
 
 def get_token_pairs(cursor):
-    query = """
-    WITH normalized_amounts AS (
-    SELECT 
-        *,
-        CASE 
-            WHEN output_symbol IN ('WETH', 'ETH', 'DAI') THEN output_amount * 1e18
-            WHEN output_symbol = 'WBTC' THEN output_amount * 1e8
-            WHEN output_symbol IN ('USDT', 'USDC') THEN output_amount * 1e6
-            ELSE output_amount
-        END AS original_output_amount
-    FROM relay_analysis_results
-    ),
-    ranges AS (
-    SELECT 
-        destination_chain_id,
-        origin_chain_id,
-        output_token,
-        input_token,
-        CASE 
-            WHEN output_amount_usd < 1000 THEN '0-1k'
-            WHEN output_amount_usd < 10000 THEN '1k-10k'
-            WHEN output_amount_usd < 100000 THEN '10k-100k'
-            ELSE '100k+'
-        END AS amount_range,
-        POWER(10, FLOOR(LOG10(original_output_amount))) AS output_amount_range
-    FROM normalized_amounts
-    )
-    SELECT 
-        destination_chain_id,
-        origin_chain_id,
-        output_token,
-        input_token,
-        POWER(10, FLOOR(LOG10(AVG(output_amount_range)))) as output_amount         
-    FROM ranges
-    GROUP BY 
-        destination_chain_id,
-        origin_chain_id,
-        output_token,
-        input_token,
-        amount_range
-    ORDER BY 
-        destination_chain_id,
-        origin_chain_id,
-        output_token,
-        input_token,
-        amount_range;
-    """
-    cursor.execute(query)
+    # Amounts are scaled back to raw units, so a token without known decimals cannot be quoted
+    cursor.execute(UNKNOWN_DECIMALS_QUERY)
+    for destination_chain_id, output_token, fills in cursor.fetchall():
+        logging.warning(f"Skipping {fills} fills of {output_token} on chain {destination_chain_id}: not in token_registry, decimals unknown")
+
+    cursor.execute(TOKEN_PAIRS_QUERY)
     return cursor.fetchall()
 
 def main():
+    connection = None
+    cursor = None
     try:
-        connection = mysql.connector.connect(**db_config)
+        connection = database.get_connection()
         if connection.is_connected():
             cursor = connection.cursor()
             
@@ -148,10 +154,11 @@ def main():
     except Error as e:
         logging.error(f"Database error: {e}")
     finally:
-        if connection.is_connected():
+        if cursor is not None:
             cursor.close()
+        if connection is not None:
             connection.close()
-            logging.info("MySQL connection is closed")
+            logging.info("MySQL connection returned to pool")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
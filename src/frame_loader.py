@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from mysql.connector import FieldType
+import database
+
+DEFAULT_CHUNK_SIZE = 50000
+CATEGORICAL_SUFFIXES = ('_symbol', '_chain_id')
+
+FLOAT_TYPES = {FieldType.DECIMAL, FieldType.NEWDECIMAL, FieldType.FLOAT, FieldType.DOUBLE}
+INT_TYPES = {FieldType.TINY, FieldType.SHORT, FieldType.LONG, FieldType.LONGLONG, FieldType.INT24, FieldType.YEAR}
+DATETIME_TYPES = {FieldType.DATE, FieldType.DATETIME, FieldType.TIMESTAMP, FieldType.NEWDATE}
+
+def column_kinds(description, exact_decimal, categorical):
+    kinds = []
+    for name, type_code, *_ in description:
+        if name in categorical:
+            kinds.append('category')
+        elif type_code in FLOAT_TYPES:
+            kinds.append('decimal' if exact_decimal and type_code in (FieldType.DECIMAL, FieldType.NEWDECIMAL) else 'float')
+        elif type_code in INT_TYPES:
+            kinds.append('int')
+        elif type_code in DATETIME_TYPES:
+            kinds.append('datetime')
+        else:
+            kinds.append('object')
+    return kinds
+
+def convert_chunk(values, kind):
+    if kind == 'float':
+        return pd.Series(np.array([np.nan if v is None else float(v) for v in values], dtype='float64'))
+    if kind == 'int':
+        if any(v is None for v in values):
+            return pd.Series(pd.array(values, dtype='Int64'))
+        return pd.Series(np.array(values, dtype='int64'))
+    if kind == 'datetime':
+        return pd.Series(pd.to_datetime(list(values)))
+    if kind == 'category':
+        return pd.Series(pd.Categorical(values))
+    return pd.Series(np.array(values, dtype=object))
+
+def combine_chunks(chunks, kind):
+    if not chunks:
+        return pd.Series([], dtype='float64' if kind == 'float' else object)
+    if kind == 'category':
+        return pd.Series(union_categoricals([chunk.values for chunk in chunks], sort_categories=True))
+    return pd.concat(chunks, ignore_index=True)
+
+def load_frame(query, params=None, chunk_size=DEFAULT_CHUNK_SIZE, exact_decimal=False, categorical=None):
+    # Rows are pulled through an unbuffered cursor and converted chunk by chunk into typed
+    # columns, so the full result never exists as Python tuples or object-typed Decimals.
+    # exact_decimal keeps DECIMAL columns as Decimal objects for callers doing exact arithmetic.
+    with database.connection(database.POOL_STREAMING) as conn:
+        cursor = conn.cursor(buffered=False)
+        try:
+            cursor.execute(query, params or ())
+            columns = [col[0] for col in cursor.description]
+            if categorical is None:
+                categorical = [name for name in columns if name.endswith(CATEGORICAL_SUFFIXES)]
+            kinds = column_kinds(cursor.description, exact_decimal, set(categorical))
+
+            chunks = [[] for _ in columns]
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for i, values in enumerate(zip(*rows)):
+                    chunks[i].append(convert_chunk(values, kinds[i]))
+        finally:
+            cursor.close()
+
+    return pd.DataFrame({name: combine_chunks(chunks[i], kinds[i]) for i, name in enumerate(columns)})
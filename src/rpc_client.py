@@ -0,0 +1,52 @@
+import threading
+import requests
+
+UNSUPPORTED_METHOD_HINTS = ('method not found', 'not supported', 'does not exist', 'not available', 'unsupported method')
+
+_local = threading.local()
+
+
+def get_session():
+    if not hasattr(_local, 'session'):
+        _local.session = requests.Session()
+    return _local.session
+
+def batch_call(rpc_endpoint, calls, timeout=30):
+    payload = [
+        {'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params}
+        for request_id, (method, params) in enumerate(calls)
+    ]
+    response = get_session().post(rpc_endpoint, json=payload, timeout=timeout)
+    response.raise_for_status()
+    body = response.json()
+
+    if isinstance(body, dict):
+        error = body.get('error') or {'message': f"Unexpected batch response: {body}"}
+        return [(None, error) for _ in calls]
+
+    responses = {item.get('id'): item for item in body}
+    results = []
+    for request_id in range(len(calls)):
+        item = responses.get(request_id)
+        if item is None:
+            results.append((None, {'message': 'No response for request'}))
+        elif item.get('error') is not None:
+            results.append((None, item['error']))
+        elif item.get('result') is None:
+            results.append((None, {'message': 'Empty result'}))
+        else:
+            results.append((item['result'], None))
+    return results
+
+def to_int(value, default=0):
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return int(value, 16)
+    return int(value)
+
+def is_unsupported_method(error):
+    if error.get('code') == -32601:
+        return True
+    message = str(error.get('message', '')).lower()
+    return any(hint in message for hint in UNSUPPORTED_METHOD_HINTS)
@@ -0,0 +1,645 @@
+import os
+import sys
+import mysql.connector
+from datetime import date, timedelta
+import database
+import token_registry
+from db_operations import DatabaseOperations as SyncOperations
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'analysis'))
+import analysis_helper
+from analysis_helper import DatabaseOperations as AnalysisOperations
+
+# Lookup tables small enough that a full scan is the expected plan
+SMALL_TABLES = ('target_combo',)
+
+BASE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS filled_v3_relays (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        chain_id INT NOT NULL,
+        input_token VARCHAR(42) NOT NULL,
+        output_token VARCHAR(42) NOT NULL,
+        input_amount DECIMAL(65,0) NOT NULL,
+        output_amount DECIMAL(65,0) NOT NULL,
+        repayment_chain_id INT NOT NULL,
+        origin_chain_id INT NOT NULL,
+        deposit_id INT NOT NULL,
+        fill_deadline DATETIME NOT NULL,
+        exclusivity_deadline DATETIME NOT NULL,
+        exclusive_relayer VARCHAR(42) NOT NULL,
+        relayer VARCHAR(42) NOT NULL,
+        depositor VARCHAR(42) NOT NULL,
+        recipient VARCHAR(42) NOT NULL,
+        message TEXT,
+        transaction_hash VARCHAR(66) NOT NULL,
+        block_number INT NOT NULL,
+        log_index INT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE KEY unique_event (origin_chain_id, transaction_hash, log_index)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS v3_funds_deposited (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        chain_id INT NOT NULL,
+        block_number INT NOT NULL,
+        transaction_hash VARCHAR(66) NOT NULL,
+        log_index INT NOT NULL,
+        input_token VARCHAR(42) NOT NULL,
+        output_token VARCHAR(42) NOT NULL,
+        input_amount VARCHAR(78) NOT NULL,
+        output_amount VARCHAR(78) NOT NULL,
+        destination_chain_id INT NOT NULL,
+        deposit_id INT NOT NULL,
+        quote_timestamp INT NOT NULL,
+        fill_deadline INT NOT NULL,
+        exclusivity_deadline INT NOT NULL,
+        depositor VARCHAR(42) NOT NULL,
+        recipient VARCHAR(42) NOT NULL,
+        exclusive_relayer VARCHAR(42) NOT NULL,
+        message TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE KEY unique_event (chain_id, transaction_hash, log_index)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS transaction_details (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        chain_id INT NOT NULL,
+        transaction_hash VARCHAR(66) NOT NULL,
+        block_timestamp DATETIME NOT NULL,
+        gas_used BIGINT NOT NULL,
+        gas_price DECIMAL(65,0) NOT NULL,
+        total_gas_fee DECIMAL(65,0) NOT NULL,
+        event_type ENUM('deposit', 'fill') NOT NULL,
+        UNIQUE KEY unique_transaction (chain_id, transaction_hash, event_type)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS relay_analysis (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        destination_chain_id INT NOT NULL,
+        origin_chain_id INT NOT NULL,
+        input_token VARCHAR(42) NOT NULL,
+        output_token VARCHAR(42) NOT NULL,
+        input_amount DECIMAL(65,0) NOT NULL,
+        output_amount DECIMAL(65,0) NOT NULL,
+        deposit_id INT NOT NULL,
+        relayer VARCHAR(42) NOT NULL,
+        depositor VARCHAR(42) NOT NULL,
+        recipient VARCHAR(42) NOT NULL,
+        earned_amount DECIMAL(65,0) NOT NULL,
+        gas_fee DECIMAL(65,0),
+        priority_fee DECIMAL(65,0),
+        input_amount_usd DECIMAL(65,2),
+        output_amount_usd DECIMAL(65,2),
+        earned_amount_usd DECIMAL(65,2),
+        UNIQUE KEY unique_relay (destination_chain_id, origin_chain_id, deposit_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS block_details (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        chain_id INT NOT NULL,
+        block_number INT NOT NULL,
+        block_timestamp DATETIME NOT NULL,
+        gas_used BIGINT NOT NULL,
+        gas_limit BIGINT NOT NULL,
+        base_fee_per_gas DECIMAL(65,0),
+        UNIQUE KEY unique_block (chain_id, block_number)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS token_prices (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        token_address VARCHAR(42) NOT NULL,
+        symbol VARCHAR(20),
+        price_date DATE NOT NULL,
+        price_usd DECIMAL(30, 18) NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        UNIQUE KEY unique_token_price (token_address, symbol, price_date),
+        KEY idx_token_address (token_address),
+        KEY idx_price_date (price_date),
+        KEY idx_symbol (symbol)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS chain_sync_status (
+        chain_id INT NOT NULL,
+        last_synced_block INT NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (chain_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS chain_block_window (
+        chain_id INT NOT NULL,
+        window_size INT NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (chain_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS sync_watermarks (
+        chain_id INT NOT NULL,
+        stage VARCHAR(32) NOT NULL,
+        watermark BIGINT NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (chain_id, stage)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS pending_blocks (
+        chain_id INT NOT NULL,
+        block_number BIGINT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (chain_id, block_number)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS relay_analysis_results (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        deposit_id INT NOT NULL,
+        destination_chain_id INT NOT NULL,
+        origin_chain_id INT NOT NULL,
+        input_token VARCHAR(42) NOT NULL,
+        output_token VARCHAR(42) NOT NULL,
+        relayer VARCHAR(42) NOT NULL,
+        depositor VARCHAR(42) NOT NULL,
+        recipient VARCHAR(42) NOT NULL,
+        input_amount DECIMAL(65, 18) NOT NULL,
+        output_amount DECIMAL(65, 18) NOT NULL,
+        input_amount_usd DECIMAL(65, 18) NOT NULL,
+        output_amount_usd DECIMAL(65, 18) NOT NULL,
+        input_symbol VARCHAR(10) NOT NULL,
+        output_symbol VARCHAR(10) NOT NULL,
+        gas_fee DECIMAL(65, 18) NOT NULL,
+        priority_fee DECIMAL(65, 18) NOT NULL,
+        base_fee_per_gas DECIMAL(65, 9) NOT NULL,
+        gas_used BIGINT NOT NULL,
+        priority_fee_per_gas DECIMAL(65, 9) NOT NULL,
+        relay_time INT NOT NULL,
+        deposit_block_time DATETIME NOT NULL,
+        fill_block_time DATETIME NOT NULL,
+        transaction_hash VARCHAR(66),
+        exclusive_relayer VARCHAR(42),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS relay_analysis_pending (
+        fill_id INT NOT NULL,
+        deposit_id INT NOT NULL,
+        destination_chain_id INT NOT NULL,
+        attempts INT NOT NULL DEFAULT 0,
+        first_seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_attempt_at TIMESTAMP NULL,
+        PRIMARY KEY (fill_id),
+        KEY idx_pending_deposit (deposit_id, destination_chain_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS target_combo (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        origin_chain_id INT NOT NULL,
+        destination_chain_id INT NOT NULL,
+        input_symbol VARCHAR(10) NOT NULL,
+        output_symbol VARCHAR(10) NOT NULL,
+        amount_range VARCHAR(20) NOT NULL,
+        UNIQUE KEY unique_combo (origin_chain_id, destination_chain_id, input_symbol, output_symbol, amount_range)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS fee_data (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        timestamp DATETIME,
+        input_token VARCHAR(255),
+        output_token VARCHAR(255),
+        origin_chain_id INT,
+        destination_chain_id INT,
+        amount DECIMAL(65,0),
+        total_relay_fee_pct DECIMAL(65,0),
+        relayer_capital_fee_pct DECIMAL(65,0),
+        relayer_gas_fee_pct DECIMAL(65,0),
+        lp_fee_pct DECIMAL(65,0),
+        quote_block INT,
+        min_deposit DECIMAL(65,0),
+        max_deposit DECIMAL(65,0),
+        max_deposit_instant DECIMAL(65,0),
+        max_deposit_short_delay DECIMAL(65,0),
+        recommended_deposit_instant DECIMAL(65,0),
+        deposit_id VARCHAR(255)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS fee_data_hourly (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        timestamp DATETIME,
+        input_token VARCHAR(255),
+        output_token VARCHAR(255),
+        origin_chain_id INT,
+        destination_chain_id INT,
+        amount DECIMAL(65,0),
+        total_relay_fee_pct DECIMAL(65,0),
+        relayer_capital_fee_pct DECIMAL(65,0),
+        relayer_gas_fee_pct DECIMAL(65,0),
+        lp_fee_pct DECIMAL(65,0),
+        quote_block INT,
+        min_deposit DECIMAL(65,0),
+        max_deposit DECIMAL(65,0),
+        max_deposit_instant DECIMAL(65,0),
+        max_deposit_short_delay DECIMAL(65,0),
+        recommended_deposit_instant DECIMAL(65,0)
+    )
+    """,
+]
+
+JOIN_PATH_INDEXES = [
+    ('filled_v3_relays', 'idx_deposit_origin', ('deposit_id', 'origin_chain_id')),
+    ('filled_v3_relays', 'idx_chain_block', ('chain_id', 'block_number')),
+    ('filled_v3_relays', 'idx_chain_fill_id', ('chain_id', 'id')),
+    ('filled_v3_relays', 'idx_tx_chain', ('transaction_hash', 'chain_id')),
+    ('v3_funds_deposited', 'idx_deposit_chain', ('deposit_id', 'chain_id')),
+    ('v3_funds_deposited', 'idx_deposit_dest', ('deposit_id', 'destination_chain_id')),
+    ('v3_funds_deposited', 'idx_chain_block', ('chain_id', 'block_number')),
+    ('v3_funds_deposited', 'idx_tx_chain', ('transaction_hash', 'chain_id')),
+    ('transaction_details', 'idx_tx_chain', ('transaction_hash', 'chain_id')),
+    ('relay_analysis', 'idx_deposit_id', ('deposit_id',)),
+    ('relay_analysis_results', 'idx_deposit_destination', ('deposit_id', 'destination_chain_id')),
+    ('relay_analysis_results', 'idx_combo_fill_time', ('origin_chain_id', 'destination_chain_id', 'input_symbol', 'output_symbol', 'fill_block_time')),
+    ('relay_analysis_results', 'idx_fill_block_time', ('fill_block_time',)),
+    ('fee_data', 'idx_deposit_route', ('deposit_id', 'origin_chain_id', 'destination_chain_id')),
+]
+
+AMOUNT_RANGE_EXPRESSION = """CASE
+            WHEN input_amount_usd < 1000 THEN '0-1k'
+            WHEN input_amount_usd < 10000 THEN '1k-10k'
+            WHEN input_amount_usd < 100000 THEN '10k-100k'
+            ELSE '100k+'
+        END"""
+
+GENERATED_COLUMNS = [
+    ('relay_analysis_results', 'amount_range', f"VARCHAR(10) GENERATED ALWAYS AS ({AMOUNT_RANGE_EXPRESSION}) STORED NOT NULL AFTER output_symbol"),
+    ('relay_analysis_results', 'fill_date', "DATE GENERATED ALWAYS AS (DATE(fill_block_time)) STORED NOT NULL AFTER fill_block_time"),
+    ('relay_analysis_results', 'half_day', "CHAR(2) GENERATED ALWAYS AS (IF(HOUR(fill_block_time) < 12, 'AM', 'PM')) STORED NOT NULL AFTER fill_date"),
+]
+
+COVERING_INDEXES = [
+    ('relay_analysis_results', 'idx_fill_date_combo_range', (
+        'fill_date', 'origin_chain_id', 'destination_chain_id', 'input_symbol', 'output_symbol', 'amount_range',
+        'input_amount_usd', 'output_amount_usd', 'gas_fee_usd', 'relay_time'
+    )),
+    ('relay_analysis_results', 'idx_combo_range_fill_time', (
+        'origin_chain_id', 'destination_chain_id', 'input_symbol', 'output_symbol', 'amount_range', 'fill_block_time'
+    )),
+]
+
+# Sample days for the rollups, which rebuild the days touched since the last run
+ROLLUP_DAYS = (date.today() - timedelta(days=1), date.today())
+
+# Each entry is the statement exactly as the code runs it, with sample parameters
+HOT_QUERIES = [
+    ('relay materializer (new fills)', AnalysisOperations.new_fills_query, (1, 0, 1000)),
+    ('relay materializer (pending fills)', AnalysisOperations.pending_fills_query, (0, 1000, analysis_helper.MAX_PENDING_ATTEMPTS)),
+    ('fetch_and_insert_relay_data (deposit ids)', SyncOperations.unrelayed_deposit_ids_query, ()),
+    ('fetch_and_insert_relay_data', SyncOperations.relay_analysis_insert_query.format('%s, %s'), (1, 2)),
+    ('get_unprocessed_transactions (fills)', SyncOperations.unprocessed_transactions_query.format(table='filled_v3_relays'), (1, 1, 0)),
+    ('get_unprocessed_transactions (deposits)', SyncOperations.unprocessed_transactions_query.format(table='v3_funds_deposited'), (1, 1, 0)),
+    ('get_pending_blocks (purge)', SyncOperations.purge_pending_blocks_query, (1,)),
+    ('get_pending_blocks', SyncOperations.pending_blocks_query, (1,)),
+    ('get_block_timestamps', SyncOperations.block_timestamps_query.format('%s, %s'), (1, 1, 2)),
+    ('fee_fetcher token pairs', AnalysisOperations.fee_token_pairs_query, ()),
+    ('daily stats touched days', AnalysisOperations.daily_stats_touched_dates_query, (0, 1000)),
+    ('daily stats rollup', AnalysisOperations.daily_stats_rollup_query.format(condition="fill_date IN (%s, %s)"), ROLLUP_DAYS),
+    ('target_combo_query', AnalysisOperations.target_combo_query.format(table='target_combo'), ()),
+    ('relayer daily stats touched days', AnalysisOperations.relayer_daily_stats_touched_dates_query, (0, 1000, ROLLUP_DAYS[0])),
+    ('relayer daily stats rollup', AnalysisOperations.relayer_daily_stats_rollup_query.format(condition="fill_date IN (%s, %s)"), ROLLUP_DAYS),
+    ('relayer daily fee stats rollup', AnalysisOperations.relayer_daily_fee_stats_rollup_query.format(condition="rar.fill_date IN (%s, %s)"), ROLLUP_DAYS),
+    ('target relayer combo', AnalysisOperations.target_relayer_combo_select.format(**analysis_helper.MYSQL_DATES), ()),
+]
+
+def index_exists(cursor, table, index_name):
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+    """, (table, index_name))
+    return cursor.fetchone()[0] > 0
+
+def ensure_index(cursor, table, index_name, columns):
+    if index_exists(cursor, table, index_name):
+        return False
+    print(f"Creating index {index_name} on {table} ({', '.join(columns)})")
+    cursor.execute(f"CREATE INDEX {index_name} ON {table} ({', '.join(columns)})")
+    return True
+
+def column_exists(cursor, table, column):
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+    """, (table, column))
+    return cursor.fetchone()[0] > 0
+
+def ensure_column(cursor, table, column, definition):
+    if column_exists(cursor, table, column):
+        return False
+    print(f"Adding column {column} to {table}")
+    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return True
+
+def create_base_tables(cursor):
+    for statement in BASE_TABLES:
+        cursor.execute(statement)
+
+def seed_sync_state(cursor):
+    cursor.execute("""
+        INSERT IGNORE INTO sync_watermarks (chain_id, stage, watermark)
+        SELECT chain_id, stage.name, last_synced_block - 1
+        FROM chain_sync_status
+        CROSS JOIN (
+            SELECT 'filled_v3_relays' AS name
+            UNION ALL
+            SELECT 'v3_funds_deposited'
+        ) AS stage
+    """)
+    cursor.execute("""
+        INSERT IGNORE INTO pending_blocks (chain_id, block_number)
+        SELECT combined.chain_id, combined.block_number
+        FROM (
+            SELECT chain_id, block_number FROM filled_v3_relays
+            UNION
+            SELECT chain_id, block_number FROM v3_funds_deposited
+        ) AS combined
+        LEFT JOIN block_details b ON b.chain_id = combined.chain_id AND b.block_number = combined.block_number
+        WHERE b.block_number IS NULL
+    """)
+
+def create_join_path_indexes(cursor):
+    for table, index_name, columns in JOIN_PATH_INDEXES:
+        ensure_index(cursor, table, index_name, columns)
+
+def create_token_registry(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS token_registry (
+            chain_id INT NOT NULL,
+            token_address VARCHAR(42) NOT NULL,
+            symbol VARCHAR(20) NOT NULL,
+            decimals TINYINT UNSIGNED NOT NULL,
+            enabled BOOLEAN NOT NULL DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (chain_id, token_address),
+            KEY idx_token_address (token_address)
+        )
+    """)
+    cursor.executemany("""
+        INSERT IGNORE INTO token_registry (chain_id, token_address, symbol, decimals, enabled)
+        VALUES (%s, %s, %s, %s, %s)
+    """, token_registry.SEED_TOKENS)
+
+def create_token_price_history(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS token_price_history (
+            symbol VARCHAR(20) NOT NULL,
+            bucket_start DATETIME NOT NULL,
+            price_usd DECIMAL(30, 18) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (symbol, bucket_start)
+        )
+    """)
+    cursor.execute("""
+        INSERT IGNORE INTO token_price_history (symbol, bucket_start, price_usd)
+        SELECT symbol, price_date, AVG(price_usd)
+        FROM token_prices
+        WHERE symbol IS NOT NULL
+        GROUP BY symbol, price_date
+    """)
+
+def add_native_fee_usd(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS chain_native_token (
+            chain_id INT NOT NULL,
+            symbol VARCHAR(20) NOT NULL,
+            PRIMARY KEY (chain_id)
+        )
+    """)
+    cursor.executemany(
+        "INSERT IGNORE INTO chain_native_token (chain_id, symbol) VALUES (%s, %s)",
+        list(token_registry.NATIVE_TOKENS.items())
+    )
+    ensure_column(cursor, 'relay_analysis_results', 'gas_fee_usd', 'DECIMAL(65, 18) AFTER priority_fee')
+    ensure_column(cursor, 'relay_analysis_results', 'priority_fee_usd', 'DECIMAL(65, 18) AFTER gas_fee_usd')
+    cursor.execute("""
+        UPDATE relay_analysis_results r
+        JOIN chain_native_token n ON n.chain_id = r.destination_chain_id
+        JOIN token_price_history h ON h.symbol = n.symbol AND h.bucket_start = COALESCE(
+            (SELECT MAX(p.bucket_start) FROM token_price_history p WHERE p.symbol = n.symbol AND p.bucket_start <= r.fill_block_time),
+            (SELECT MIN(p.bucket_start) FROM token_price_history p WHERE p.symbol = n.symbol)
+        )
+        SET r.gas_fee_usd = r.gas_fee * h.price_usd,
+            r.priority_fee_usd = r.priority_fee * h.price_usd
+        WHERE r.gas_fee_usd IS NULL
+    """)
+    # Rows with no native price history keep the flat $2700 the queries used to assume
+    cursor.execute("""
+        UPDATE relay_analysis_results
+        SET gas_fee_usd = gas_fee * 2700,
+            priority_fee_usd = priority_fee * 2700
+        WHERE gas_fee_usd IS NULL
+    """)
+
+def add_generated_columns(cursor):
+    for table, column, definition in GENERATED_COLUMNS:
+        ensure_column(cursor, table, column, definition)
+    for table, index_name, columns in COVERING_INDEXES:
+        ensure_index(cursor, table, index_name, columns)
+
+def create_daily_stats(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS relay_daily_stats (
+            fill_date DATE NOT NULL,
+            half_day CHAR(2) NOT NULL,
+            origin_chain_id INT NOT NULL,
+            destination_chain_id INT NOT NULL,
+            input_symbol VARCHAR(10) NOT NULL,
+            output_symbol VARCHAR(10) NOT NULL,
+            amount_range VARCHAR(10) NOT NULL,
+            output_amount_range VARCHAR(20) NOT NULL,
+            volume_usd DECIMAL(65, 18) NOT NULL,
+            input_volume_usd DECIMAL(65, 18) NOT NULL,
+            profit_usd DECIMAL(65, 18) NOT NULL,
+            transaction_count INT NOT NULL,
+            relay_time_sum BIGINT NOT NULL,
+            max_input_amount_usd DECIMAL(65, 18) NOT NULL,
+            priority_fee_ratio_sum DECIMAL(65, 18),
+            priority_fee_ratio_count INT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (fill_date, origin_chain_id, destination_chain_id, input_symbol, output_symbol, amount_range, half_day, output_amount_range)
+        )
+    """)
+    cursor.execute("DELETE FROM relay_daily_stats")
+    cursor.execute(AnalysisOperations.daily_stats_rollup_query.format(condition='TRUE'))
+    cursor.execute("""
+        INSERT INTO sync_watermarks (chain_id, stage, watermark)
+        SELECT %s, %s, COALESCE(MAX(id), 0) FROM relay_analysis_results
+        ON DUPLICATE KEY UPDATE watermark = VALUES(watermark)
+    """, (analysis_helper.DAILY_STATS_CHAIN_ID, analysis_helper.STAGE_DAILY_STATS))
+
+def create_relayer_daily_stats(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS relayer_daily_stats (
+            fill_date DATE NOT NULL,
+            origin_chain_id INT NOT NULL,
+            destination_chain_id INT NOT NULL,
+            input_symbol VARCHAR(10) NOT NULL,
+            output_symbol VARCHAR(10) NOT NULL,
+            amount_range VARCHAR(10) NOT NULL,
+            relayer VARCHAR(42) NOT NULL,
+            transaction_count INT NOT NULL DEFAULT 0,
+            volume_usd DECIMAL(65, 18) NOT NULL DEFAULT 0,
+            fee_transaction_count INT NOT NULL DEFAULT 0,
+            fee_volume_usd DECIMAL(65, 18) NOT NULL DEFAULT 0,
+            fee_profit_usd DECIMAL(65, 18) NOT NULL DEFAULT 0,
+            fee_net_profit_usd DECIMAL(65, 18) NOT NULL DEFAULT 0,
+            fee_relay_time_sum BIGINT NOT NULL DEFAULT 0,
+            fee_priority_fee_usd_sum DECIMAL(65, 18) NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (origin_chain_id, destination_chain_id, input_symbol, output_symbol, amount_range, fill_date, relayer),
+            KEY idx_fill_date (fill_date)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS relayer_daily_stats_dirty (
+            fill_date DATE NOT NULL,
+            marked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (fill_date)
+        )
+    """)
+    # The first refresh rebuilds the whole current window
+    cursor.execute("""
+        INSERT IGNORE INTO relayer_daily_stats_dirty (fill_date)
+        SELECT DISTINCT fill_date FROM relay_analysis_results
+        WHERE fill_date >= DATE_SUB(CURDATE(), INTERVAL 7 DAY)
+    """)
+    cursor.execute("""
+        INSERT INTO sync_watermarks (chain_id, stage, watermark)
+        SELECT %s, %s, COALESCE(MAX(id), 0) FROM relay_analysis_results
+        ON DUPLICATE KEY UPDATE watermark = VALUES(watermark)
+    """, (analysis_helper.DAILY_STATS_CHAIN_ID, analysis_helper.STAGE_RELAYER_DAILY_STATS))
+
+MIGRATIONS = [
+    (1, 'Create base tables', create_base_tables),
+    (2, 'Seed sync watermarks and pending block queue', seed_sync_state),
+    (3, 'Add join-path composite indexes', create_join_path_indexes),
+    (4, 'Create and seed token registry', create_token_registry),
+    (5, 'Create hourly token price history', create_token_price_history),
+    (6, 'Store native-token USD gas and priority fees per fill', add_native_fee_usd),
+    (7, 'Add stored amount_range, fill_date and half_day with covering indexes', add_generated_columns),
+    (8, 'Create and backfill the relay_daily_stats rollup', create_daily_stats),
+    (9, 'Create relayer_daily_stats and its dirty-day queue', create_relayer_daily_stats),
+]
+
+def ensure_migrations_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT NOT NULL,
+            description VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (version)
+        )
+    """)
+
+def get_applied_versions(cursor):
+    ensure_migrations_table(cursor)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+def migrate(target_version=None):
+    with database.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            applied = get_applied_versions(cursor)
+            for version, description, apply in MIGRATIONS:
+                if version in applied or (target_version is not None and version > target_version):
+                    continue
+                print(f"Applying migration {version}: {description}")
+                apply(cursor)
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                    (version, description)
+                )
+                conn.commit()
+            print("Schema is up to date.")
+        except mysql.connector.Error as err:
+            print(f"Migration failed: {err}")
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+def status():
+    with database.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            applied = get_applied_versions(cursor)
+        finally:
+            cursor.close()
+
+    for version, description, _ in MIGRATIONS:
+        state = 'applied' if version in applied else 'pending'
+        print(f"{version:>4}  {state:<8} {description}")
+
+def explain_query(cursor, query, params):
+    cursor.execute("EXPLAIN " + query, params)
+    return cursor.fetchall()
+
+def check():
+    flagged = []
+    with database.connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            for name, query, params in HOT_QUERIES:
+                try:
+                    plan = explain_query(cursor, query, params)
+                except mysql.connector.Error as err:
+                    print(f"[ERROR] {name}: {err}")
+                    flagged.append(name)
+                    continue
+
+                problems = [
+                    row for row in plan
+                    if row['type'] in ('ALL', 'index')
+                    and row['table'] and not row['table'].startswith('<')
+                    and row['table'] not in SMALL_TABLES
+                ]
+                label = 'FULL SCAN' if problems else 'ok'
+                print(f"[{label}] {name}")
+                for row in plan:
+                    marker = '  !' if row in problems else '   '
+                    print(f"{marker} table={row['table']} type={row['type']} key={row['key']} rows={row['rows']} extra={row['Extra']}")
+                if problems:
+                    flagged.append(name)
+        finally:
+            cursor.close()
+
+    if flagged:
+        print(f"{len(flagged)} of {len(HOT_QUERIES)} hot queries scan a full table or index: {', '.join(flagged)}")
+    else:
+        print(f"All {len(HOT_QUERIES)} hot queries use indexed access paths.")
+    return not flagged
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage the relayer-analysis database schema")
+    parser.add_argument('command', choices=['migrate', 'status', 'check'], help='migrate: apply pending migrations, status: list migrations, check: EXPLAIN hot queries and flag full scans')
+    parser.add_argument('--target', type=int, default=None, help='Stop migrating after this version')
+    args = parser.parse_args()
+
+    if args.command == 'migrate':
+        migrate(args.target)
+    elif args.command == 'status':
+        status()
+    elif not check():
+        sys.exit(1)
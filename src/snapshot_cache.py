@@ -0,0 +1,194 @@
+import json
+import os
+from datetime import datetime
+from decimal import Decimal
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import database
+from frame_loader import load_frame
+
+DEFAULT_SNAPSHOT_DIR = os.path.join('snapshots', 'relay_analysis_results')
+MANIFEST_FILE = '_manifest.json'
+PARTITION_FILE = 'part-0.parquet'
+# Bumped when the partition schema changes; an older snapshot is rewritten in full
+SNAPSHOT_VERSION = 2
+
+COMBO_COLUMNS = ('origin_chain_id', 'destination_chain_id', 'input_symbol', 'output_symbol')
+PARTITIONING = ds.partitioning(pa.schema([
+    ('fill_date', pa.date32()),
+    ('origin_chain_id', pa.int64()),
+    ('destination_chain_id', pa.int64()),
+    ('input_symbol', pa.string()),
+    ('output_symbol', pa.string()),
+]), flavor='hive')
+
+# DECIMAL(65, scale) columns, stored at the same precision so no value can overflow
+DECIMAL_COLUMNS = {
+    'input_amount': 18, 'output_amount': 18, 'input_amount_usd': 18, 'output_amount_usd': 18,
+    'gas_fee': 18, 'priority_fee': 18, 'gas_fee_usd': 18, 'priority_fee_usd': 18,
+    'base_fee_per_gas': 9, 'priority_fee_per_gas': 9
+}
+
+def read_manifest(snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {'watermark': 0, 'partitions': {}}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def write_manifest(snapshot_dir, manifest):
+    path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    tmp_path = os.path.join(snapshot_dir, '.' + MANIFEST_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def partition_path(snapshot_dir, fill_date, combo):
+    origin_chain_id, destination_chain_id, input_symbol, output_symbol = combo
+    return os.path.join(
+        snapshot_dir,
+        f"fill_date={fill_date.isoformat()}",
+        f"origin_chain_id={origin_chain_id}",
+        f"destination_chain_id={destination_chain_id}",
+        f"input_symbol={input_symbol}",
+        f"output_symbol={output_symbol}"
+    )
+
+def to_arrow_table(df, watermark):
+    arrays = []
+    names = []
+    for name in df.columns:
+        if name == 'fill_date' or name in COMBO_COLUMNS:
+            continue
+        if name in DECIMAL_COLUMNS:
+            arrays.append(pa.array(df[name], type=pa.decimal256(65, DECIMAL_COLUMNS[name]), from_pandas=True))
+        elif df[name].dtype == object:
+            arrays.append(pa.array(df[name], type=pa.string(), from_pandas=True))
+        else:
+            arrays.append(pa.array(df[name], from_pandas=True))
+        names.append(name)
+    table = pa.Table.from_arrays(arrays, names=names)
+    return table.replace_schema_metadata({'watermark': str(watermark)})
+
+def write_partition(snapshot_dir, fill_date, combo, df, watermark):
+    directory = partition_path(snapshot_dir, fill_date, combo)
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, '.' + PARTITION_FILE + '.tmp')
+    pq.write_table(to_arrow_table(df, watermark), tmp_path)
+    os.replace(tmp_path, os.path.join(directory, PARTITION_FILE))
+
+def get_changed_partitions(watermark, high):
+    with database.cursor() as cursor:
+        cursor.execute("""
+            SELECT DISTINCT fill_date, origin_chain_id, destination_chain_id, input_symbol, output_symbol
+            FROM relay_analysis_results
+            WHERE id > %s AND id <= %s
+        """, (watermark, high))
+        changed = {}
+        for fill_date, *combo in cursor.fetchall():
+            changed.setdefault(fill_date, []).append(tuple(combo))
+        return changed
+
+def refresh_snapshot(snapshot_dir=DEFAULT_SNAPSHOT_DIR, full=False):
+    manifest = read_manifest(snapshot_dir)
+    if manifest['partitions'] and manifest.get('version') != SNAPSHOT_VERSION:
+        print(f"Snapshot in {snapshot_dir} was written with an older schema, rewriting every partition")
+        full = True
+    if full:
+        manifest = {'watermark': 0, 'partitions': {}}
+    manifest['version'] = SNAPSHOT_VERSION
+    watermark = manifest['watermark']
+
+    with database.cursor() as cursor:
+        cursor.execute("SELECT MAX(id) FROM relay_analysis_results")
+        high = cursor.fetchone()[0] or 0
+
+    if high <= watermark:
+        print(f"Snapshot in {snapshot_dir} is up to date at result id {watermark}")
+        return 0
+
+    changed = get_changed_partitions(watermark, high)
+    print(f"Refreshing {sum(len(combos) for combos in changed.values())} partitions across {len(changed)} days up to result id {high}")
+    os.makedirs(snapshot_dir, exist_ok=True)
+
+    written = 0
+    for fill_date in sorted(changed):
+        combos = changed[fill_date]
+        placeholders = ', '.join(['(%s, %s, %s, %s)'] * len(combos))
+        query = f"""
+            SELECT * FROM relay_analysis_results
+            WHERE fill_date = %s AND id <= %s
+            AND (origin_chain_id, destination_chain_id, input_symbol, output_symbol) IN ({placeholders})
+        """
+        params = [fill_date, high] + [value for combo in combos for value in combo]
+        df = load_frame(query, params, exact_decimal=True, categorical=[])
+
+        for combo, group in df.groupby(list(COMBO_COLUMNS), sort=False):
+            write_partition(snapshot_dir, fill_date, combo, group, high)
+            manifest['partitions'][os.path.relpath(partition_path(snapshot_dir, fill_date, combo), snapshot_dir)] = {
+                'rows': len(group),
+                'watermark': high
+            }
+            written += 1
+
+    # The watermark only moves once every changed partition is on disk
+    manifest['watermark'] = high
+    manifest['refreshed_at'] = datetime.utcnow().isoformat(timespec='seconds')
+    write_manifest(snapshot_dir, manifest)
+    print(f"Wrote {written} partitions to {snapshot_dir}")
+    return written
+
+def combo_filters(combos, extra=()):
+    # extra conditions (e.g. amount_filters) are ANDed onto every combo
+    return [
+        [(column, '=', value) for column, value in zip(COMBO_COLUMNS, combo)] + list(extra)
+        for combo in combos
+    ]
+
+def amount_filters(column, low=None, high=None):
+    # Decimal bounds: pyarrow cannot compare an int literal with a DECIMAL(65, x) column
+    filters = []
+    if low is not None:
+        filters.append((column, '>=', Decimal(str(low))))
+    if high is not None:
+        filters.append((column, '<=', Decimal(str(high))))
+    return filters
+
+def float_schema(schema):
+    return pa.schema([
+        pa.field(field.name, pa.float64()) if pa.types.is_decimal(field.type) else field
+        for field in schema
+    ])
+
+def snapshot_dataset(snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    # DECIMAL columns are cast to float64 while scanning: DuckDB cannot read 65-digit decimals itself
+    dataset = ds.dataset(snapshot_dir, format='parquet', partitioning=PARTITIONING)
+    return ds.dataset(snapshot_dir, schema=float_schema(dataset.schema), format='parquet', partitioning=PARTITIONING)
+
+def read_snapshot(columns=None, filters=None, exact_decimal=False, snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    if not os.path.exists(os.path.join(snapshot_dir, MANIFEST_FILE)):
+        raise FileNotFoundError(f"No snapshot in {snapshot_dir}. Run: python snapshot_cache.py refresh")
+
+    # Partition filters prune directories before any file is opened; the rest are pushed into the scan
+    table = pq.read_table(snapshot_dir, columns=columns, filters=filters, partitioning=PARTITIONING)
+    if not exact_decimal:
+        table = table.cast(float_schema(table.schema))
+    return table.to_pandas()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Maintain a local Parquet snapshot of relay_analysis_results")
+    parser.add_argument('command', choices=['refresh', 'status'], help='refresh: export changed partitions, status: show the snapshot watermark')
+    parser.add_argument('--dir', default=DEFAULT_SNAPSHOT_DIR, help='Snapshot directory')
+    parser.add_argument('--full', action='store_true', help='Rewrite every partition instead of only the changed ones')
+    args = parser.parse_args()
+
+    if args.command == 'refresh':
+        refresh_snapshot(args.dir, args.full)
+    else:
+        manifest = read_manifest(args.dir)
+        print(f"Watermark: {manifest['watermark']}")
+        print(f"Refreshed at: {manifest.get('refreshed_at', 'never')}")
+        print(f"Partitions: {len(manifest['partitions'])}")
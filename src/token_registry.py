@@ -0,0 +1,133 @@
+import threading
+import database
+
+# (chain_id, token_address, symbol, decimals, enabled)
+# Enabled tokens are the ones materialized into relay_analysis_results.
+# The rest are known only so their price can be looked up by symbol.
+SEED_TOKENS = [
+    (1, '0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2', 'WETH', 18, True),
+    (1, '0x2260fac5e5542a773aa44fbcfedf7c193bc2c599', 'WBTC', 8, True),
+    (1, '0x6b175474e89094c44da98b954eedeac495271d0f', 'DAI', 18, True),
+    (1, '0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48', 'USDC', 6, True),
+    (1, '0xdac17f958d2ee523a2206206994597c13d831ec7', 'USDT', 6, True),
+    (10, '0x4200000000000000000000000000000000000006', 'WETH', 18, True),
+    (10, '0x68f180fcce6836688e9084f035309e29bf0a2095', 'WBTC', 8, True),
+    (10, '0xda10009cbd5d07dd0cecc66161fc93d7c9000da1', 'DAI', 18, True),
+    (10, '0x0b2c639c533813f4aa9d7837caf62653d097ff85', 'USDC', 6, True),
+    (10, '0x94b008aa00579c1307b0ef2c499ad98a8ce58e58', 'USDT', 6, True),
+    (8453, '0x4200000000000000000000000000000000000006', 'WETH', 18, True),
+    (8453, '0x50c5725949a6f0c72e6c4a641f24049a917db0cb', 'DAI', 18, True),
+    (8453, '0x833589fcd6edb6e08f4c7c32d4f71b54bda02913', 'USDC', 6, True),
+    (8453, '0xfde4c96c8593536e31f229ea8f37b2ada2699bb2', 'USDT', 6, True),
+    (137, '0x7ceb23fd6bc0add59e62ac25578270cff1b9f619', 'WETH', 18, True),
+    (137, '0x1bfd67037b42cf73acf2047067bd4f2c47d9bfd6', 'WBTC', 8, True),
+    (137, '0x8f3cf7ad23cd3cadbd9735aff958023239c6a063', 'DAI', 18, True),
+    (137, '0x2791bca1f2de4661ed88a30c99a7a9449aa84174', 'USDC', 6, True),
+    (137, '0xc2132d05d31c914a87c6611c10748aeb04b58e8f', 'USDT', 6, True),
+    (42161, '0x82af49447d8a07e3bd95bd0d56f35241523fbab1', 'WETH', 18, True),
+    (42161, '0x2f2a2543b76a4166549f7aab2e75bef0aefc5b0f', 'WBTC', 8, True),
+    (42161, '0xda10009cbd5d07dd0cecc66161fc93d7c9000da1', 'DAI', 18, True),
+    (42161, '0xaf88d065e77c8cc2239327c5edb3a432268e5831', 'USDC', 6, True),
+    (42161, '0xfd086bc7cd5c481dcc9c85ebe478a1c0b69fcbb9', 'USDT', 6, True),
+    (59144, '0xe5d7c2a44ffddf6b295a15c148167daaaf5cf34f', 'WETH', 18, False),
+    (59144, '0xa219439258ca9da29e9cc4ce5596924745e12b93', 'USDT', 6, False),
+    (59144, '0x176211869ca2b568f2a7d4ee941e073a821ee1ff', 'USDC', 6, False),
+    (59144, '0x3aab2285ddcddad8edf438c1bab47e1a9d05a9b4', 'WBTC', 8, False),
+    (59144, '0x4b9eb6c0b6ea15176bbf62841c6b2a8a398cb656', 'DAI', 18, False),
+    (324, '0x3355df6d4c9c3035724fd0e3914de96a5a83aaf4', 'USDC', 6, False),
+    (324, '0x493257fd37edb34451f62edf8d2a0c418852ba4c', 'USDT', 6, False),
+    (324, '0x5aea5775959fbc2557cc8789bc1bf90a239d9a91', 'WETH', 18, False),
+    (324, '0xbbeb516fb02a01611cbbe0453fe3c580d7281011', 'WBTC', 8, False),
+    (324, '0x4af15ec2a0bd43db75dd04e62faa3b8ef36b00d5', 'DAI', 18, False),
+    (534352, '0x5300000000000000000000000000000000000004', 'WETH', 18, False),
+    (534352, '0x06efdbff2a14a7c8e15944d1f4a48f9f95f663a4', 'USDC', 6, False),
+    (534352, '0xf55bec9cafdbe8730f096aa55dad6d22d44099df', 'USDT', 6, False),
+    (534352, '0x3c1bca5a656e69edcd0d4e36bebb3fcdaca60cf1', 'WBTC', 8, False),
+    (81457, '0x4300000000000000000000000000000000000004', 'WETH', 18, False),
+    (81457, '0x4300000000000000000000000000000000000003', 'USDB', 18, False),
+    (81457, '0xf7bc58b8d8f97adc129cfc4c9f45ce3c0e1d2692', 'WBTC', 8, False),
+    (34443, '0xd988097fb8612cc24eec14542bc03424c656005f', 'USDC', 6, False),
+    (34443, '0xf0f161fda2712db8b566946122a5af183995e2ed', 'USDT', 6, False),
+    (34443, '0xcdd475325d6f564d27247d1dddbb0dac6fa0a5cf', 'WBTC', 8, False),
+    (1135, '0xac485391eb2d7d88253a7f1ef18c37f4242d1a24', 'LSK', 18, False),
+    (7777777, '0xcccccccc7021b32ebb4e8c08314bd62f7c653ec4', 'USDC', 6, False),
+    (1, '0x9f8f72aa9304c8b593d555f12ef6589cc3a579a2', 'MKR', 18, False),
+    (1, '0xf951e335afb289353dc249e82926178eac7ded78', 'WETH', 18, False),
+    (1, '0xd9a442856c234a39a81a089c06451ebaa4306a72', 'WETH', 18, False),
+    (1, '0xbf5495efe5db9ce00f80364c8b423567e58d2110', 'WETH', 18, False),
+    (1, '0xae7ab96520de3a18e5e111b5eaab095312d7fe84', 'WETH', 18, False),
+    (1, '0x582d872a1b094fc48f5de31d3b73f2d9be47def1', 'TON', 9, False),
+    (1, '0xfae103dc9cf190ed75350761e95403b7b8afa6c0', 'WETH', 18, False),
+    (1, '0xcd5fe23c85820f7b72d0926fc9b05b43e359b7ee', 'WETH', 18, False),
+    (1, '0x6de037ef9ad2725eb40118bb1702ebb27e4aeb24', 'RENDER', 18, False),
+    (1, '0x83f20f44975d03b1b09e64809b757c47f942beea', 'DAI', 18, False),
+    (8453, '0xd9aaec86b65d86f6a7b5b1b0c42ffa531710b6ca', 'USDC', 6, False),
+    (8453, '0x2ae3f1ec7f1f5012cfeab0185bfc7aa3cf0dec22', 'WETH', 18, False),
+    (8453, '0x2da56acb9ea78330f947bd57c54119debda7af71', 'MOG', 18, False),
+]
+
+# Symbol (as priced in token_price_history) of each chain's native gas token
+NATIVE_TOKENS = {
+    1: 'WETH',
+    10: 'WETH',
+    137: 'POL',
+    324: 'WETH',
+    1135: 'WETH',
+    8453: 'WETH',
+    34443: 'WETH',
+    42161: 'WETH',
+    59144: 'WETH',
+    81457: 'WETH',
+    534352: 'WETH',
+    7777777: 'WETH',
+}
+
+_tokens = None
+_lock = threading.Lock()
+
+def load_tokens(force=False):
+    global _tokens
+    with _lock:
+        if _tokens is None or force:
+            with database.cursor() as cursor:
+                cursor.execute("""
+                    SELECT chain_id, token_address, symbol, decimals, enabled
+                    FROM token_registry
+                """)
+                _tokens = {
+                    (chain_id, token_address.lower()): {
+                        'chain_id': chain_id,
+                        'token_address': token_address.lower(),
+                        'symbol': symbol,
+                        'decimals': decimals,
+                        'enabled': bool(enabled)
+                    }
+                    for chain_id, token_address, symbol, decimals, enabled in cursor.fetchall()
+                }
+        return _tokens
+
+def get_token(chain_id, token_address):
+    return load_tokens().get((chain_id, token_address.lower()))
+
+def find_symbol(chain_id, token_address):
+    # The same address can be a different token (or nothing) on another chain
+    token = get_token(chain_id, token_address)
+    return token['symbol'] if token else None
+
+def register_token(chain_id, token_address, symbol, decimals, enabled=False):
+    query = """
+    INSERT IGNORE INTO token_registry (chain_id, token_address, symbol, decimals, enabled)
+    VALUES (%s, %s, %s, %s, %s)
+    """
+    with database.cursor(commit=True) as cursor:
+        cursor.execute(query, (chain_id, token_address.lower(), symbol, decimals, enabled))
+
+    with _lock:
+        if _tokens is not None:
+            _tokens.setdefault((chain_id, token_address.lower()), {
+                'chain_id': chain_id,
+                'token_address': token_address.lower(),
+                'symbol': symbol,
+                'decimals': decimals,
+                'enabled': enabled
+            })
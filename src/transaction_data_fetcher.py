@@ -1,9 +1,23 @@
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from web3 import Web3
-from datetime import datetime
-from db_operations import DatabaseOperations
+from db_operations import DatabaseOperations, BULK_MODE_EXECUTEMANY, BULK_MODE_LOAD_DATA, DEFAULT_BULK_BATCH_SIZE
+from event_data_fetcher import fetch_block_batch
+from rpc_client import batch_call, is_unsupported_method, to_int
 from web3.middleware import geth_poa_middleware
 
+BLOCKS_PER_RECEIPTS_REQUEST = 10
+BLOCK_BATCH_SIZE = 100
+TRANSACTIONS_PER_BATCH = 100
+DEFAULT_CHAIN_CONCURRENCY = 4
+
+# Serializes the switch to per-transaction calls across executor threads
+_receipts_fallback_lock = threading.Lock()
+
+class BlockReceiptsUnsupported(Exception):
+    pass
+
 def load_config(filename):
     with open(filename, 'r') as f:
         return json.load(f)
@@ -13,58 +27,163 @@ def setup_web3(rpc_endpoint):
     w3.middleware_onion.inject(geth_poa_middleware, layer=0)
     return w3
 
-def fetch_transaction_details(w3, transaction_hash, chain_id, event_type, db_ops):
+def load_block_timestamps(rpc_endpoint, chain_id, block_numbers, db_ops):
+    block_numbers = sorted(set(block_numbers))
+    block_timestamps = db_ops.get_block_timestamps(chain_id, block_numbers)
+
+    missing = [block_number for block_number in block_numbers if block_number not in block_timestamps]
+    print(f"Loaded {len(block_timestamps)} block timestamps for chain {chain_id} from block_details. Fetching {len(missing)} missing blocks.")
+
+    for i in range(0, len(missing), BLOCK_BATCH_SIZE):
+        block_details = [details for details in fetch_block_batch(rpc_endpoint, chain_id, missing[i:i+BLOCK_BATCH_SIZE]) if details is not None]
+        db_ops.insert_block_details(chain_id, block_details)
+        block_timestamps.update((details[1], details[2]) for details in block_details)
+
+    return block_timestamps
+
+def fetch_transaction_gas(w3, transaction_hash):
     try:
         tx = w3.eth.get_transaction(transaction_hash)
         tx_receipt = w3.eth.get_transaction_receipt(transaction_hash)
-        block = w3.eth.get_block(tx['blockNumber'])
-        
-        block_timestamp = datetime.fromtimestamp(block['timestamp'])
-        gas_used = tx_receipt['gasUsed']
-        gas_price = tx['gasPrice']
-        total_gas_fee = gas_used * gas_price
-
-        inserted = db_ops.insert_transaction_details(
-            chain_id,
-            transaction_hash,
-            block_timestamp,
-            gas_used,
-            gas_price,
-            total_gas_fee,
-            event_type
-        )
-        
-        if not inserted:
-            print(f"Failed to insert transaction details for {transaction_hash}")            
-    
+        return tx_receipt['gasUsed'], tx['gasPrice']
     except Exception as e:
         print(f"Error fetching transaction details for {transaction_hash}: {e}")
-
-def process_transactions(db_ops, chain_config):
+        return None
+
+def fetch_block_receipts(rpc_endpoint, block_numbers):
+    responses = batch_call(rpc_endpoint, [('eth_getBlockReceipts', [hex(block_number)]) for block_number in block_numbers])
+
+    block_receipts = {}
+    for block_number, (receipts, error) in zip(block_numbers, responses):
+        if error is not None and is_unsupported_method(error):
+            raise BlockReceiptsUnsupported(error.get('message'))
+        if error is not None:
+            print(f"Error fetching receipts for block {block_number}: {error}")
+            continue
+
+        block_receipts[block_number] = {receipt['transactionHash'].lower(): receipt for receipt in receipts}
+    return block_receipts
+
+def group_by_block(transactions):
+    transactions_by_block = {}
+    for tx_hash, block_number in transactions:
+        transactions_by_block.setdefault(block_number, []).append(tx_hash)
+    return transactions_by_block
+
+def build_batches(transactions, max_blocks, max_transactions):
+    batches = []
+    batch = []
+    for block_number, tx_hashes in group_by_block(transactions).items():
+        if batch and (len(batch) >= max_blocks or sum(len(hashes) for _, hashes in batch) + len(tx_hashes) > max_transactions):
+            batches.append(batch)
+            batch = []
+        batch.append((block_number, tx_hashes))
+    if batch:
+        batches.append(batch)
+    return batches
+
+def fetch_batch_gas(w3, rpc_endpoint, batch, receipts_enabled):
+    block_receipts = {}
+    if receipts_enabled.is_set():
+        block_numbers = [block_number for block_number, _ in batch]
+        try:
+            block_receipts = fetch_block_receipts(rpc_endpoint, block_numbers)
+        except BlockReceiptsUnsupported as e:
+            with _receipts_fallback_lock:
+                if receipts_enabled.is_set():
+                    print(f"eth_getBlockReceipts is not supported ({e}). Falling back to per-transaction calls.")
+                    receipts_enabled.clear()
+        except Exception as e:
+            print(f"Error fetching receipts for blocks {block_numbers[0]}-{block_numbers[-1]}: {e}")
+
+    gas_details = {}
+    for block_number, tx_hashes in batch:
+        receipts = block_receipts.get(block_number, {})
+        for tx_hash in tx_hashes:
+            receipt = receipts.get(tx_hash.lower())
+            # Some nodes and L2s omit effectiveGasPrice; those transactions fall back to the per-transaction lookup
+            if receipt is not None and receipt.get('effectiveGasPrice') is not None:
+                gas_details[tx_hash] = (to_int(receipt['gasUsed']), to_int(receipt['effectiveGasPrice']))
+            else:
+                gas_details[tx_hash] = fetch_transaction_gas(w3, tx_hash)
+    return gas_details
+
+def process_transaction_list(w3, rpc_endpoint, transactions, chain_id, event_type, db_ops, block_timestamps, max_concurrency=1, use_block_receipts=False):
+    if use_block_receipts:
+        batches = build_batches(transactions, BLOCKS_PER_RECEIPTS_REQUEST, float('inf'))
+    else:
+        batches = build_batches(transactions, float('inf'), TRANSACTIONS_PER_BATCH)
+
+    receipts_enabled = threading.Event()
+    if use_block_receipts:
+        receipts_enabled.set()
+    failed = False
+    total_inserted = 0
+    total_processed = 0
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        results = executor.map(lambda batch: fetch_batch_gas(w3, rpc_endpoint, batch, receipts_enabled), batches)
+
+        for batch, gas_details in zip(batches, results):
+            rows = []
+            failed_blocks = []
+            for block_number, tx_hashes in batch:
+                block_timestamp = block_timestamps.get(block_number)
+                for tx_hash in tx_hashes:
+                    gas = gas_details.get(tx_hash)
+                    if gas is None or block_timestamp is None:
+                        failed_blocks.append(block_number)
+                        continue
+                    gas_used, gas_price = gas
+                    rows.append((chain_id, tx_hash, block_timestamp, gas_used, gas_price, gas_used * gas_price, event_type))
+
+            watermark = None
+            if not failed:
+                watermark = min(failed_blocks) - 1 if failed_blocks else batch[-1][0]
+                failed = bool(failed_blocks)
+
+            _, inserted = db_ops.insert_transaction_details_batch(chain_id, event_type, rows, watermark)
+            total_inserted += inserted
+            total_processed += sum(len(tx_hashes) for _, tx_hashes in batch)
+            print(f"Processed {total_processed}/{len(transactions)} {event_type} transactions for chain {chain_id}. Inserted: {total_inserted}")
+
+    return total_inserted
+
+def process_transactions(db_ops, chain_config, use_block_receipts=False, max_concurrency=DEFAULT_CHAIN_CONCURRENCY):
     w3 = setup_web3(chain_config['rpc_endpoint'])
     chain_id = chain_config['chainid']
+    max_concurrency = chain_config.get('max_concurrency', max_concurrency)
 
     fill_txs = db_ops.get_unprocessed_transactions('filled_v3_relays', chain_id)
     deposit_txs = db_ops.get_unprocessed_transactions('v3_funds_deposited', chain_id)
 
-    print(f"Processing {len(fill_txs)} fill transactions for chain {chain_id}")
-    for tx_hash in fill_txs:
-        fetch_transaction_details(w3, tx_hash, chain_id, 'fill', db_ops)
+    block_numbers = [block_number for _, block_number in fill_txs + deposit_txs]
+    block_timestamps = load_block_timestamps(chain_config['rpc_endpoint'], chain_id, block_numbers, db_ops)
 
-    print(f"Processing {len(deposit_txs)} deposit transactions for chain {chain_id}")
-    for tx_hash in deposit_txs:
-        fetch_transaction_details(w3, tx_hash, chain_id, 'deposit', db_ops)
+    for event_type, transactions in (('fill', fill_txs), ('deposit', deposit_txs)):
+        print(f"Processing {len(transactions)} {event_type} transactions for chain {chain_id}")
+        process_transaction_list(
+            w3,
+            chain_config['rpc_endpoint'],
+            transactions,
+            chain_id,
+            event_type,
+            db_ops,
+            block_timestamps,
+            max_concurrency,
+            use_block_receipts
+        )
 
-def main():
+def main(use_block_receipts=False, max_concurrency=DEFAULT_CHAIN_CONCURRENCY, bulk_mode=BULK_MODE_EXECUTEMANY, bulk_batch_size=DEFAULT_BULK_BATCH_SIZE):
     config = load_config('config.json')
 
-    db_ops = DatabaseOperations()
+    db_ops = DatabaseOperations(bulk_mode, bulk_batch_size)
 
     try:
         db_ops.connect()
 
         for chain_config in config:
-            process_transactions(db_ops, chain_config)
+            process_transactions(db_ops, chain_config, use_block_receipts, max_concurrency)
 
     except Exception as e:
         print(f"An error occurred: {e}")
@@ -75,4 +194,18 @@ def main():
     print("Transaction details fetching completed.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fetch transaction gas details for Across protocol events")
+    parser.add_argument('--block-receipts', action='store_true', help='Fetch receipts per block with eth_getBlockReceipts')
+    parser.add_argument('--chain-concurrency', type=int, default=DEFAULT_CHAIN_CONCURRENCY, help='Max in-flight RPC batches per chain')
+    parser.add_argument('--bulk-mode', choices=[BULK_MODE_EXECUTEMANY, BULK_MODE_LOAD_DATA], default=BULK_MODE_EXECUTEMANY, help='Write path for transaction_details')
+    parser.add_argument('--bulk-batch-size', type=int, default=DEFAULT_BULK_BATCH_SIZE, help='Rows per multi-row INSERT in executemany mode')
+    args = parser.parse_args()
+
+    main(
+        use_block_receipts=args.block_receipts,
+        max_concurrency=args.chain_concurrency,
+        bulk_mode=args.bulk_mode,
+        bulk_batch_size=args.bulk_batch_size
+    )
\ No newline at end of file